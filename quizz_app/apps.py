@@ -0,0 +1,39 @@
+"""
+=============================================================================
+Project-level App Configuration
+=============================================================================
+
+CloudinaryConfig is only added to INSTALLED_APPS when settings.USE_CLOUDINARY
+is true (CLOUDINARY_CLOUD_NAME is set and DEBUG is off), so the Cloudinary
+SDK is imported and configured only in environments that actually store
+media there.
+
+Author: Quizfy Team
+=============================================================================
+"""
+
+from django.apps import AppConfig
+
+
+class CloudinaryConfig(AppConfig):
+    """Configures the Cloudinary client once the app registry is ready."""
+
+    name = "quizz_app"
+    verbose_name = "Cloudinary"
+
+    def ready(self):
+        from django.conf import settings
+
+        # Same switch that put this app in INSTALLED_APPS
+        if not settings.USE_CLOUDINARY:
+            return
+
+        import cloudinary
+
+        credentials = settings.CLOUDINARY_STORAGE
+        cloudinary.config(
+            cloud_name=credentials["CLOUD_NAME"],
+            api_key=credentials["API_KEY"],
+            api_secret=credentials["API_SECRET"],
+            secure=True  # Always use HTTPS
+        )
@@ -1,67 +1,507 @@
 # quizz_app/email_backends.py
-import os
+import json
+import base64
+import time
 import logging
+import threading
+from collections import Counter, defaultdict
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.mime.base import MIMEBase
+
+from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
+# The SendGrid SDK is imported inside the methods that use it: this module
+# also holds AsyncEmailBackend, which may wrap plain SMTP, and processes that
+# never send through SendGrid shouldn't pay for loading it.
 
 logger = logging.getLogger(__name__)
 
+# SendGrid accepts at most 1000 personalizations per /mail/send request
+MAX_PERSONALIZATIONS = 1000
+
+# Statuses worth retrying with backoff (rate limited / upstream hiccup)
+RETRY_STATUSES = frozenset({429, 502, 503})
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.5
+
+# Full tracebacks logged per error class per minute; the rest are counted
+ERROR_LOG_SAMPLE = 5
+
+# Headers this backend reads itself (see _template_id); never sent on
+CONTROL_HEADERS = frozenset({"X-SG-Template", "X-SG-Data"})
+
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+class _TokenBucket:
+    """
+    Simple thread-safe token bucket.
+
+    acquire() blocks until a token is available, smoothing bursts down to
+    `rate` requests per second (with up to `capacity` allowed at once).
+    A rate of 0 or less turns limiting off.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        # Room for at least one whole token, or fractional rates (0.5/s)
+        # could never fill up enough to send anything
+        self.capacity = max(1.0, float(capacity or rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _ErrorSampler:
+    """Allows at most `limit` log records per key per `window` seconds."""
+
+    def __init__(self, limit, window=60.0):
+        self.limit = limit
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._seen.get(key, (now, 0))
+            if now - start >= self.window:
+                start, count = now, 0
+            self._seen[key] = (start, count + 1)
+            return count < self.limit
+
+
+_error_sampler = _ErrorSampler(ERROR_LOG_SAMPLE)
+
+
+# Shared by every backend instance/thread in this process
+_bucket = None
+_bucket_lock = threading.Lock()
+
+
+def _get_bucket():
+    """
+    The process-wide token bucket, filled at settings.EMAIL_RATE_PER_SEC.
+
+    Built on first use and rebuilt if the setting changes (override_settings
+    in tests), so the rate isn't frozen at import time.
+    """
+    global _bucket
+    rate = float(getattr(settings, "EMAIL_RATE_PER_SEC", 14))
+    if _bucket is None or _bucket.rate != rate:
+        with _bucket_lock:
+            if _bucket is None or _bucket.rate != rate:
+                _bucket = _TokenBucket(rate)
+    return _bucket
+
+
 class SendGridEmailBackend(BaseEmailBackend):
     """
     Django email backend using SendGrid API (no SMTP).
+
+    Messages sharing the same sender, subject and body are batched into a
+    single API call with one personalization per message. Messages with
+    cc/bcc, reply-to, custom headers or attachments are sent on their own,
+    carrying all of those.
+
+    The API client is created once and kept on the backend, so the HTTPS
+    keep-alive connection is reused across messages and send_mail() calls.
+    Independent requests are dispatched in parallel, up to
+    settings.SENDGRID_CONCURRENCY at a time; the client builds a fresh
+    request object per call, so sharing it across worker threads is safe.
     """
 
+    def __init__(self, fail_silently=False, api_key=None, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        # settings already read the key from the environment once
+        self.api_key = api_key or getattr(settings, "SENDGRID_API_KEY", "")
+        self._sg = None
+
+    def open(self):
+        """Create the API client if needed. Returns True if a new one was built."""
+        if self._sg is not None:
+            return False
+        if not self.api_key:
+            return False
+        from sendgrid import SendGridAPIClient
+
+        self._sg = SendGridAPIClient(self.api_key)
+        return True
+
+    def close(self):
+        self._sg = None
+
     def send_messages(self, email_messages):
-        api_key = os.getenv("SENDGRID_API_KEY")
-        if not api_key:
+        if not self.api_key:
             logger.error("SENDGRID_API_KEY is missing")
             return 0
 
-        sent_count = 0
+        self.open()
+        self._err_counts = Counter()
+        self._err_lock = threading.Lock()
 
+        # Group identical messages so they share one request
+        singles = []
+        batches = defaultdict(list)
         for message in email_messages:
+            if not message.to:
+                logger.warning("No recipients found, skipping email")
+                continue
+
+            # Reply-to, headers and attachments belong to the whole request,
+            # so these messages can't share one with anything else
+            if not self._batchable(message):
+                singles.append(message)
+                continue
+
+            batches[self._batch_key(message)].append(message)
+
+        # Each job is one /mail/send request
+        jobs = []
+        for key, messages in batches.items():
+            if len(messages) == 1:
+                singles.append(messages[0])
+                continue
+            send_group = partial(self._send_batch, key)
+            for start in range(0, len(messages), MAX_PERSONALIZATIONS):
+                jobs.append((send_group, messages[start:start + MAX_PERSONALIZATIONS]))
+        jobs.extend((self._send_single, message) for message in singles)
+
+        concurrency = getattr(settings, "SENDGRID_CONCURRENCY", 10)
+        if len(jobs) <= 1 or concurrency <= 1:
+            sent_count = sum(func(arg) for func, arg in jobs)
+        else:
+            # Requests are I/O bound, so run them side by side
+            sent_count = 0
+            workers = min(concurrency, len(jobs))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(func, arg) for func, arg in jobs]
+                for future in as_completed(futures):
+                    sent_count += future.result()
+
+        # One summary line per call instead of a traceback per failure
+        failed = sum(self._err_counts.values())
+        if failed:
+            logger.error(
+                "SendGrid: sent=%d failed=%d by_class=%r",
+                sent_count, failed, dict(self._err_counts)
+            )
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info("SendGrid: sent=%d failed=0", sent_count)
+
+        return sent_count
+
+    # ========================================================================
+    # HELPERS
+    # ========================================================================
+
+    def _post(self, sg_mail):
+        """
+        Rate-limited send with exponential backoff on 429/502/503.
+        Returns the SendGrid response; other HTTP errors are re-raised.
+        """
+        from python_http_client.exceptions import HTTPError
+
+        for attempt in range(MAX_RETRIES + 1):
+            _get_bucket().acquire()
             try:
-                from_email = message.from_email or os.getenv("DEFAULT_FROM_EMAIL")
-                to_emails = list(message.to) if message.to else []
+                return self._sg.send(sg_mail)
+            except HTTPError as exc:
+                if exc.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    raise
+                delay = RETRY_BACKOFF * (2 ** attempt)
+                logger.warning(
+                    "SendGrid returned %s, retrying in %.1fs (attempt %s/%s)",
+                    exc.status_code, delay, attempt + 1, MAX_RETRIES
+                )
+                time.sleep(delay)
+
+    def _record_failure(self, what, count, exc=None, resp=None):
+        """Count a failed request; only a sample of them get a full log record."""
+        key = type(exc).__name__ if exc is not None else f"HTTP {resp.status_code}"
+        with self._err_lock:
+            self._err_counts[key] += count
+
+        if not _error_sampler.allow(key):
+            return
+        if exc is not None:
+            logger.exception("SendGrid exception while sending %s", what)
+        else:
+            logger.error("SendGrid failed: status=%s body=%s", resp.status_code, resp.body)
 
-                if not to_emails:
-                    logger.warning("No recipients found, skipping email")
-                    continue
+    @staticmethod
+    def _from_email(message):
+        return message.from_email or settings.DEFAULT_FROM_EMAIL
 
-                subject = message.subject or ""
-                plain_body = message.body or ""
+    @staticmethod
+    def _html_body(message):
+        """The HTML alternative Django built for the message, if any"""
+        return next(
+            (body for body, mimetype in getattr(message, "alternatives", ()) if mimetype == "text/html"),
+            None,
+        )
 
-                sg_mail = Mail(
-                    from_email=Email(from_email),
-                    to_emails=[To(e) for e in to_emails],
-                    subject=subject,
-                    plain_text_content=Content("text/plain", plain_body),
+    @staticmethod
+    def _template_id(message):
+        """
+        SendGrid dynamic template for the message, if it asked for one.
+
+        Callers set an "X-SG-Template" header naming an entry in
+        settings.SENDGRID_TEMPLATE_IDS, plus "X-SG-Data" with the JSON data.
+        Only the template id and data go over the wire, not the full HTML.
+        """
+        name = message.extra_headers.get("X-SG-Template")
+        if not name:
+            return None
+        return getattr(settings, "SENDGRID_TEMPLATE_IDS", {}).get(name)
+
+    @staticmethod
+    def _custom_headers(message):
+        """Headers the caller set, minus the ones this backend consumes"""
+        return {
+            name: value
+            for name, value in message.extra_headers.items()
+            if name not in CONTROL_HEADERS
+        }
+
+    def _batchable(self, message):
+        """Whether everything in the message fits in _batch_key + a personalization"""
+        return not (
+            message.cc
+            or message.bcc
+            or message.reply_to
+            or message.attachments
+            or self._custom_headers(message)
+        )
+
+    def _batch_key(self, message):
+        template_id = self._template_id(message)
+        if template_id:
+            # Content lives in the template, so only sender + template matter
+            return (self._from_email(message), message.subject or "", None, None, template_id)
+        return (
+            self._from_email(message),
+            message.subject or "",
+            message.body or "",
+            self._html_body(message),
+            None,
+        )
+
+    @staticmethod
+    def _send_errors():
+        """
+        Errors a send can reasonably hit: HTTP error responses, network/socket
+        failures (urllib's URLError is an OSError), and bad X-SG-Data JSON.
+        Anything else is a bug and propagates.
+        """
+        from python_http_client.exceptions import HTTPError
+
+        return (HTTPError, OSError, ValueError)
+
+    @staticmethod
+    def _build_mail(from_email, subject, body, html, template_id):
+        from sendgrid.helpers.mail import Mail, Email, Content
+
+        if template_id:
+            sg_mail = Mail(from_email=Email(from_email))
+            sg_mail.template_id = template_id
+            return sg_mail
+        return Mail(
+            from_email=Email(from_email),
+            subject=subject,
+            plain_text_content=Content("text/plain", body),
+            html_content=Content("text/html", html) if html is not None else None,
+        )
+
+    @staticmethod
+    def _personalization(message, template_id):
+        from sendgrid.helpers.mail import To, Personalization
+
+        personalization = Personalization()
+        for addr in message.to:
+            personalization.add_to(To(addr))
+        if template_id:
+            personalization.dynamic_template_data = json.loads(
+                message.extra_headers.get("X-SG-Data") or "{}"
+            )
+        return personalization
+
+    @staticmethod
+    def _attachment(item):
+        """SendGrid Attachment for one entry of message.attachments"""
+        from sendgrid.helpers.mail import (
+            Attachment, Disposition, FileContent, FileName, FileType
+        )
+
+        if isinstance(item, MIMEBase):
+            filename = item.get_filename()
+            content = item.get_payload(decode=True) or b""
+            mimetype = item.get_content_type()
+        else:
+            # (filename, content, mimetype); Django already filled in the
+            # mimetype and turned text/* content into str
+            filename, content, mimetype = item
+            if isinstance(content, str):
+                content = content.encode()
+
+        return Attachment(
+            FileContent(base64.b64encode(content).decode("ascii")),
+            FileName(filename or "attachment"),
+            FileType(mimetype or "application/octet-stream"),
+            Disposition("attachment"),
+        )
+
+    def _add_extras(self, sg_mail, personalization, message):
+        """Copy cc/bcc, reply-to, custom headers and attachments onto a single send"""
+        from sendgrid.helpers.mail import Bcc, Cc, Header, ReplyTo
+
+        for addr in message.cc:
+            personalization.add_cc(Cc(addr))
+        for addr in message.bcc:
+            personalization.add_bcc(Bcc(addr))
+
+        # The API takes either one reply_to or a reply_to_list, not both
+        if len(message.reply_to) == 1:
+            sg_mail.reply_to = ReplyTo(message.reply_to[0])
+        elif message.reply_to:
+            sg_mail.reply_to_list = [ReplyTo(addr) for addr in message.reply_to]
+
+        for name, value in self._custom_headers(message).items():
+            sg_mail.add_header(Header(name, str(value)))
+
+        for item in message.attachments:
+            sg_mail.add_attachment(self._attachment(item))
+
+    def _send_batch(self, key, messages):
+        """Send a group of identical messages as one request. Returns messages sent."""
+        subject = key[1]
+        try:
+            # Shared parts are built once; each message only adds a personalization
+            sg_mail = self._build_mail(*key)
+
+            # One personalization per message so recipients don't see each other
+            template_id = key[4]
+            for message in messages:
+                sg_mail.add_personalization(self._personalization(message, template_id))
+
+            resp = self._post(sg_mail)
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "SendGrid sent batch: status=%s messages=%s subject=%s",
+                    resp.status_code, len(messages), subject
                 )
 
-                # If Django built an HTML alternative, send it too
-                if hasattr(message, "alternatives") and message.alternatives:
-                    for alt_body, mimetype in message.alternatives:
-                        if mimetype == "text/html":
-                            sg_mail.add_content(Content("text/html", alt_body))
+            if 200 <= resp.status_code < 300:
+                return len(messages)
+            self._record_failure("batch", len(messages), resp=resp)
 
-                sg = SendGridAPIClient(api_key)
-                resp = sg.send(sg_mail)
+        except self._send_errors() as exc:
+            self._record_failure("batch", len(messages), exc=exc)
 
+        return 0
+
+    def _send_single(self, message):
+        """Send one message on its own. Returns 1 on success, 0 otherwise."""
+        try:
+            # Django already stores .to as a list
+            to_emails = message.to
+            subject = message.subject or ""
+
+            key = self._batch_key(message)
+            sg_mail = self._build_mail(*key)
+            personalization = self._personalization(message, key[4])
+            self._add_extras(sg_mail, personalization, message)
+            sg_mail.add_personalization(personalization)
+
+            resp = self._post(sg_mail)
+
+            if logger.isEnabledFor(logging.INFO):
                 logger.info(
                     "SendGrid sent email: status=%s to=%s subject=%s",
                     resp.status_code, to_emails, subject
                 )
 
-                # 2xx = success
-                if 200 <= resp.status_code < 300:
-                    sent_count += 1
-                else:
-                    logger.error("SendGrid failed: status=%s body=%s", resp.status_code, resp.body)
+            # 2xx = success
+            if 200 <= resp.status_code < 300:
+                return 1
+            self._record_failure("email", 1, resp=resp)
 
-            except Exception:
-                logger.exception("SendGrid exception while sending email")
+        except self._send_errors() as exc:
+            self._record_failure("email", 1, exc=exc)
 
-        return sent_count
+        return 0
+
+
+# ============================================================================
+# ASYNC WRAPPER
+# ============================================================================
+
+# Background workers shared by every AsyncEmailBackend in the process,
+# sized from settings.EMAIL_ASYNC_WORKERS when first needed
+_async_pool = None
+_async_pool_lock = threading.Lock()
+
+
+def _get_async_pool():
+    global _async_pool
+    if _async_pool is None:
+        with _async_pool_lock:
+            if _async_pool is None:
+                _async_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "EMAIL_ASYNC_WORKERS", 2),
+                    thread_name_prefix="email",
+                )
+    return _async_pool
+
+
+def _deliver(backend_path, messages):
+    """Runs on a worker thread: hand the messages to the real backend."""
+    try:
+        connection = get_connection(backend_path)
+        sent = connection.send_messages(messages)
+        if sent != len(messages):
+            logger.error("Async email: sent %s of %s messages", sent, len(messages))
+    except Exception:
+        logger.exception("Async email delivery failed")
+
+
+class AsyncEmailBackend(BaseEmailBackend):
+    """
+    Queues messages on a background thread pool and returns immediately,
+    so views (password reset, signup) don't wait on the provider.
+
+    The backend that actually delivers is settings.EMAIL_ASYNC_BACKEND.
+    Since the send happens later, the return value counts queued messages
+    and delivery errors are only logged.
+    """
+
+    def send_messages(self, email_messages):
+        messages = [m for m in email_messages if m.recipients()]
+        if not messages:
+            return 0
+
+        backend_path = getattr(
+            settings, "EMAIL_ASYNC_BACKEND", "quizz_app.email_backends.SendGridEmailBackend"
+        )
+        _get_async_pool().submit(_deliver, backend_path, messages)
+        return len(messages)
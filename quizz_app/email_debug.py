@@ -2,35 +2,41 @@
 Custom email backend with enhanced debugging
 """
 import logging
-from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
 from django.core.mail.backends.console import EmailBackend as ConsoleEmailBackend
 
+from .pooled_smtp_backend import PooledSMTPEmailBackend
+
 logger = logging.getLogger(__name__)
 
 
-class DebugSMTPEmailBackend(SMTPEmailBackend):
-    """SMTP backend with detailed logging"""
-    
+class DebugSMTPEmailBackend(PooledSMTPEmailBackend):
+    """Pooled SMTP backend with detailed logging"""
+
     def send_messages(self, email_messages):
-        logger.info(f"[EMAIL] Attempting to send {len(email_messages)} message(s) via SMTP")
-        for msg in email_messages:
-            logger.info(f"[EMAIL] Subject: {msg.subject}")
-            logger.info(f"[EMAIL] From: {msg.from_email}")
-            logger.info(f"[EMAIL] To: {msg.to}")
-        
+        if not email_messages:
+            return 0
+
+        # Skip building per-message strings unless INFO is actually on
+        log_info = logger.isEnabledFor(logging.INFO)
+        if log_info:
+            logger.info("[EMAIL] Attempting to send %s message(s) via SMTP", len(email_messages))
+            for msg in email_messages:
+                logger.info("[EMAIL] Subject: %s From: %s To: %s", msg.subject, msg.from_email, msg.to)
+
         try:
             result = super().send_messages(email_messages)
-            logger.info(f"[EMAIL] Successfully sent {result} message(s)")
+            if log_info:
+                logger.info("[EMAIL] Successfully sent %s message(s)", result)
             return result
         except Exception as e:
-            logger.error(f"[EMAIL] SMTP Error: {type(e).__name__}: {e}")
+            logger.error("[EMAIL] SMTP Error: %s: %s", type(e).__name__, e)
             raise
 
 
 class DebugConsoleEmailBackend(ConsoleEmailBackend):
     """Console backend with detailed logging"""
-    
+
     def send_messages(self, email_messages):
-        logger.warning(f"[EMAIL] EMAIL_BACKEND set to console (password not configured)")
-        logger.warning(f"[EMAIL] Would send {len(email_messages)} message(s) to console instead of SMTP")
+        logger.warning("[EMAIL] EMAIL_BACKEND set to console (password not configured)")
+        logger.warning("[EMAIL] Would send %s message(s) to console instead of SMTP", len(email_messages))
         return super().send_messages(email_messages)
@@ -0,0 +1,54 @@
+"""
+=============================================================================
+Quizfy Logging Handlers
+=============================================================================
+
+QueuedConsoleHandler:
+    A drop-in replacement for logging.StreamHandler in LOGGING. The request
+    thread only puts the record on an in-memory queue; a background
+    QueueListener thread does the stdout write + flush, so slow log
+    shipping on Render never stalls a response.
+
+Author: Quizfy Team
+=============================================================================
+"""
+
+import os
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueuedConsoleHandler(QueueHandler):
+    """QueueHandler that owns a StreamHandler and the listener feeding it."""
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        # QueueHandler.prepare() already applies this handler's formatter,
+        # so the console handler just writes record.msg as-is
+        self._console = logging.StreamHandler(stream)
+        self._listener = None
+        self._start_listener()
+
+        atexit.register(self._stop_listener)
+        # Threads don't survive fork (gunicorn --preload), so each child
+        # needs its own listener
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The parent's listener may have been blocked inside queue.get() at
+        # fork time, leaving the copied queue's lock held - start clean
+        self.queue = queue.SimpleQueue()
+        self._start_listener()
+
+    def _start_listener(self):
+        self._listener = QueueListener(self.queue, self._console, respect_handler_level=False)
+        self._listener.start()
+
+    def _stop_listener(self):
+        """Flush whatever is still queued before the process exits."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
@@ -0,0 +1,285 @@
+"""
+=============================================================================
+Quizfy Media File Serving
+=============================================================================
+
+Serves locally stored uploads (quiz images, file submissions) for
+/media/<path>.
+
+- Missing files return 404 instead of 500. Files uploaded before
+  Cloudinary was configured may have been lost in a Render redeploy.
+- Missing files are remembered for a minute, so repeat requests for a
+  lost upload don't touch the disk just to find it's still gone.
+- Responses carry a strong ETag and Last-Modified, so repeat downloads
+  get 304 Not Modified.
+- Single byte ranges (Range: bytes=a-b) are honoured with 206 Partial
+  Content, so interrupted PDF/video downloads can resume.
+- Behind nginx, MEDIA_ACCEL_REDIRECT_PREFIX hands the transfer off via
+  X-Accel-Redirect.
+- Under ASGI (uvicorn/daphne), MEDIA_ASYNC=1 switches to
+  safe_serve_media_async, which streams from a coroutine so slow disk
+  reads don't hold an event-loop thread per download.
+
+Author: Quizfy Team
+=============================================================================
+"""
+
+import os
+import re
+import asyncio
+import stat as stat_module
+import time
+import hashlib
+import mimetypes
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+# Only a single "bytes=start-end" range is supported; anything else gets the full file
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Read size for ranged responses
+CHUNK_SIZE = 64 * 1024
+
+# How long (seconds) a "missing" stat() result is reused, and how many
+# missing paths are remembered at most
+STAT_CACHE_TTL = 60
+MISSING_CACHE_SIZE = 4096
+
+# Full path -> time.monotonic() until which it counts as missing
+_missing = {}
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def _media_stat(full_path):
+    """
+    stat() a media file. Returns None for anything that isn't a regular file.
+
+    Only misses are cached (for STAT_CACHE_TTL): on Render a file that's
+    missing now stays missing until the next deploy. Existing files are
+    stat'ed on every request, since the ETag, Last-Modified and
+    Content-Length built from the result must match the file being sent,
+    even if it was replaced under the same name a moment ago.
+    """
+    now = time.monotonic()
+    expires = _missing.get(full_path)
+    if expires is not None and expires > now:
+        return None
+
+    try:
+        st = os.stat(full_path)
+    except OSError:
+        st = None
+    if st is not None and stat_module.S_ISREG(st.st_mode):
+        _missing.pop(full_path, None)
+        return st
+
+    # Bounded without LRU bookkeeping: just start over when full
+    if len(_missing) >= MISSING_CACHE_SIZE:
+        _missing.clear()
+    _missing[full_path] = now + STAT_CACHE_TTL
+    return None
+
+
+def _etag(stat):
+    """Strong validator derived from mtime + size (no need to read the file)."""
+    digest = hashlib.blake2b(f"{stat.st_mtime_ns}:{stat.st_size}".encode(), digest_size=8)
+    return f'"{digest.hexdigest()}"'
+
+
+def _parse_range(header, size):
+    """
+    Parse a Range header into (start, end) inclusive.
+
+    Returns None when the header should be ignored (missing, malformed or
+    multi-range) and raises ValueError when the range can't be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _read_range(full_path, start, length):
+    """Yield `length` bytes of the file starting at `start`."""
+    with open(full_path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _aread_range(full_path, start, length):
+    """Async twin of _read_range: each blocking read runs in a worker thread."""
+    f = await asyncio.to_thread(open, full_path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+# =============================================================================
+# SHARED REQUEST HANDLING
+# =============================================================================
+
+def _resolve(path, document_root):
+    """Map a URL path to (full_path, stat) under document_root, or raise 404."""
+    if document_root is None:
+        document_root = settings.MEDIA_ROOT
+
+    # Build full path (refusing anything outside the media root) and check existence
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404(f"Media file not found: {path}")
+    stat = _media_stat(full_path)
+    if stat is None:
+        raise Http404(f"Media file not found: {path}")
+    return full_path, stat
+
+
+def _respond(request, path, full_path, stat, reader=None):
+    """
+    Build the response for an existing file.
+
+    With `reader=None` the body is read synchronously (FileResponse for the
+    whole file); otherwise `reader(full_path, start, length)` supplies the
+    body as an (async) iterator.
+    """
+    # Behind nginx: let it stream the file (sendfile, ranges, page cache)
+    # and keep the Python worker free. Needs an internal location, e.g.
+    #   location /internal-media/ { internal; alias /app/media/; }
+    accel_prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "")
+    if accel_prefix:
+        response = HttpResponse()
+        # Empty Content-Type lets nginx pick it from the file extension
+        response["Content-Type"] = ""
+        response["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + quote(path.lstrip("/"))
+        return response
+
+    # Conditional GET: 304 when the client's copy is current
+    etag = _etag(stat)
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        if not_modified.status_code == 304:
+            not_modified["ETag"] = etag
+            not_modified["Last-Modified"] = http_date(last_modified)
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    size = stat.st_size
+
+    # Only honour Range if If-Range (when sent) still matches this version
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+    if not if_range or if_range == etag:
+        try:
+            byte_range = _parse_range(request.META.get("HTTP_RANGE"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        if reader is None:
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+        else:
+            response = StreamingHttpResponse(reader(full_path, 0, size), content_type=content_type)
+        response["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            (reader or _read_range)(full_path, start, length), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+# =============================================================================
+# VIEWS
+# =============================================================================
+
+def safe_serve_media(request, path, document_root=None):
+    """
+    Serve media files with proper error handling.
+
+    Returns 404 (not found) instead of 500 (server error) when a file
+    doesn't exist. This is important because:
+
+    1. Files uploaded before Cloudinary integration may be lost after
+       Render redeploys (ephemeral filesystem)
+    2. A 404 is more informative than a 500 error
+    3. Prevents confusing error pages for users
+
+    Args:
+        request: The HTTP request
+        path: Path to the media file (relative to MEDIA_ROOT)
+        document_root: Base directory for media files (defaults to MEDIA_ROOT)
+
+    Returns:
+        FileResponse (200), ranged response (206), 304/412 for conditional
+        requests, or an X-Accel-Redirect handoff
+
+    Raises:
+        Http404: If the file doesn't exist
+    """
+    full_path, stat = _resolve(path, document_root)
+    return _respond(request, path, full_path, stat)
+
+
+async def safe_serve_media_async(request, path, document_root=None):
+    """
+    Async version of safe_serve_media for ASGI deployments.
+
+    The stat() and every chunk read run via asyncio.to_thread, so the event
+    loop keeps serving other requests while the disk catches up. Same
+    responses as the sync view.
+    """
+    full_path, stat = await asyncio.to_thread(_resolve, path, document_root)
+    return _respond(request, path, full_path, stat, reader=_aread_range)
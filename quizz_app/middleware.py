@@ -0,0 +1,59 @@
+"""
+=============================================================================
+Project Middleware
+=============================================================================
+
+SelectiveGZipMiddleware:
+    Compresses Django-rendered responses (HTML dashboards, JSON polling
+    endpoints), except:
+    - authentication pages, which echo credentials/tokens back and are the
+      classic BREACH target, and
+    - non-text content (images, PDFs, spreadsheets), which is either already
+      compressed or not worth the CPU.
+
+Static files never reach this middleware: WhiteNoise sits above it and
+serves its own precompressed .br/.gz copies.
+
+Author: Quizfy Team
+=============================================================================
+"""
+
+from django.middleware.gzip import GZipMiddleware
+
+
+# Paths whose responses are never compressed
+GZIP_EXCLUDED_PREFIXES = (
+    "/student/login/",
+    "/student/signup/",
+    "/teacher/login/",
+    "/teacher/signup/",
+    "/password-reset/",
+    "/reset/",
+    "/change-password/",
+    "/admin/login/",
+    # Uploads are served with byte ranges/ETags that must match the file
+    "/media/",
+)
+
+# Content types worth compressing
+GZIP_CONTENT_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that skips auth pages and non-text responses."""
+
+    def process_response(self, request, response):
+        if request.path.startswith(GZIP_EXCLUDED_PREFIXES) or response.status_code == 206:
+            return response
+
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith(GZIP_CONTENT_TYPES):
+            return response
+
+        return super().process_response(request, response)
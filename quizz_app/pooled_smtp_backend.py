@@ -0,0 +1,162 @@
+"""
+=============================================================================
+Pooled SMTP Email Backend
+=============================================================================
+
+Django's SMTP backend opens a new connection (TCP + STARTTLS + AUTH) for
+every send_mail() call. This backend keeps a small pool of open
+connections per worker process and reuses them across calls.
+
+- Up to settings.EMAIL_POOL_SIZE idle connections are kept per server/account
+- Pooled connections are checked with NOOP before reuse
+- A connection is retired after settings.EMAIL_POOL_MAX_MESSAGES messages
+
+Author: Quizfy Team
+=============================================================================
+"""
+
+import queue
+import smtplib
+import threading
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+
+
+class PooledSMTP:
+    """An open SMTP connection plus the number of messages sent on it"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.sent = 0
+
+    @property
+    def exhausted(self):
+        return self.sent >= getattr(settings, "EMAIL_POOL_MAX_MESSAGES", 5000)
+
+    def close(self):
+        try:
+            self.connection.quit()
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Server already hung up; just drop the socket
+            self.connection.close()
+        except smtplib.SMTPException:
+            pass
+
+    def is_alive(self):
+        """Cheap health check before handing out a pooled connection"""
+        try:
+            return self.connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+
+class PooledSMTPEmailBackend(SMTPEmailBackend):
+    """
+    SMTP backend that reuses connections across send_messages() calls.
+
+    The pool is a class attribute, so it lives for the whole worker process
+    and is shared by every backend instance (Django creates one per
+    send_mail() call).
+    """
+
+    # (host, port, user, tls, ssl) -> Queue of idle PooledSMTP
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        # self.connection is borrowed per call, so serialize like Django does
+        with self._lock:
+            return self._send_pooled(email_messages)
+
+    # ========================================================================
+    # CONNECTION POOL
+    # ========================================================================
+
+    def _pool(self):
+        key = (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = queue.Queue(
+                    maxsize=getattr(settings, "EMAIL_POOL_SIZE", 5)
+                )
+        return pool
+
+    def _connect(self):
+        """Open a brand new connection using Django's open() logic"""
+        self.connection = None
+        self.open()
+        connection, self.connection = self.connection, None
+        return PooledSMTP(connection) if connection else None
+
+    def _checkout(self):
+        pool = self._pool()
+        while True:
+            try:
+                pooled = pool.get_nowait()
+            except queue.Empty:
+                return self._connect(), False
+            if pooled.is_alive():
+                return pooled, True
+            # Server timed the idle connection out; drop it and try the next
+            pooled.close()
+
+    def _checkin(self, pooled):
+        if pooled.exhausted:
+            pooled.close()
+            return
+        try:
+            self._pool().put_nowait(pooled)
+        except queue.Full:
+            pooled.close()
+
+    def _send_pooled(self, email_messages):
+        pooled, reused = self._checkout()
+        if pooled is None:
+            # open() failed silently (fail_silently=True)
+            return 0
+
+        num_sent = 0
+        try:
+            for message in email_messages:
+                if pooled.exhausted:
+                    pooled.close()
+                    pooled, reused = self._connect(), False
+                    if pooled is None:
+                        break
+
+                self.connection = pooled.connection
+                try:
+                    sent = self._send(message)
+                except smtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    # Idle pooled connection was dropped by the server: close
+                    # its socket (close() swallows the errors a dead
+                    # connection raises) so it isn't leaked, then retry once
+                    # on a fresh one. It was checked out, so it's not in the pool.
+                    pooled.close()
+                    pooled, reused = self._connect(), False
+                    if pooled is None:
+                        break
+                    self.connection = pooled.connection
+                    sent = self._send(message)
+
+                reused = True
+                if sent:
+                    num_sent += 1
+                    pooled.sent += 1
+        except Exception:
+            if pooled is not None:
+                pooled.close()
+                pooled = None
+            raise
+        finally:
+            self.connection = None
+            if pooled is not None:
+                self._checkin(pooled)
+
+        return num_sent
@@ -2,30 +2,39 @@
 Custom SendGrid email backend with debug logging
 """
 import logging
-from sendgrid_backend import SendgridBackend as OriginalSendgridBackend
+
+from .email_backends import SendGridEmailBackend
 
 logger = logging.getLogger(__name__)
 
 
-class SendgridBackend(OriginalSendgridBackend):
-    """SendGrid backend with detailed logging"""
+class SendgridBackend(SendGridEmailBackend):
+    """
+    SendGrid backend with detailed logging.
+
+    Delivery is done by SendGridEmailBackend, which batches messages that
+    share sender/subject/body into one /mail/send call (up to 1000
+    personalizations each). Messages with cc/bcc, reply-to, custom headers
+    or attachments are sent one per call, with all of those included.
+    """
     
     def send_messages(self, email_messages):
         """Send messages and log the results"""
         if not email_messages:
             return 0
         
-        logger.info(f"[SENDGRID] Attempting to send {len(email_messages)} message(s)")
-        
-        for msg in email_messages:
-            logger.info(f"[SENDGRID] Subject: {msg.subject}")
-            logger.info(f"[SENDGRID] From: {msg.from_email}")
-            logger.info(f"[SENDGRID] To: {msg.to}")
-        
+        # Skip building per-message strings unless INFO is actually on
+        log_info = logger.isEnabledFor(logging.INFO)
+        if log_info:
+            logger.info("[SENDGRID] Attempting to send %s message(s)", len(email_messages))
+            for msg in email_messages:
+                logger.info("[SENDGRID] Subject: %s From: %s To: %s", msg.subject, msg.from_email, msg.to)
+
         try:
             result = super().send_messages(email_messages)
-            logger.info(f"[SENDGRID] Successfully sent {result} message(s)")
+            if log_info:
+                logger.info("[SENDGRID] Successfully sent %s message(s)", result)
             return result
         except Exception as e:
-            logger.error(f"[SENDGRID] Error: {type(e).__name__}: {e}")
+            logger.error("[SENDGRID] Error: %s: %s", type(e).__name__, e)
             raise
@@ -24,6 +24,8 @@ Email (SendGrid preferred):
     - EMAIL_HOST           : SMTP server hostname
     - EMAIL_HOST_USER      : SMTP username
     - EMAIL_HOST_PASSWORD  : SMTP password
+    - EMAIL_ASYNC          : "1" to send emails from a background thread
+    - SENDGRID_TEMPLATE_PASSWORD_RESET : SendGrid dynamic template id (d-...)
 
 Optional:
     - OPENAI_API_KEY       : For AI-powered learning analytics
@@ -35,12 +37,27 @@ Last Updated: 2024
 """
 
 import os
+import importlib.util
 from pathlib import Path
 
 import dj_database_url
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+
+
+# Snapshot of the environment, read once at import time
+_E = os.environ.copy()
+
+
+def _env(key, default=None, cast=str):
+    """
+    Return an environment variable from the snapshot, passed through `cast`.
+
+    With a non-str cast (e.g. cast=int), a variable that is set but blank
+    (EMAIL_PORT= in a .env file) counts as unset and gives `default`.
+    """
+    value = _E.get(key)
+    if value is None or (cast is not str and not value.strip()):
+        return default
+    return cast(value)
 
 
 # =============================================================================
@@ -51,11 +68,11 @@ import cloudinary.api
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Security key - MUST be changed in production via environment variable
-SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dev-insecure-key")
+SECRET_KEY = _env("DJANGO_SECRET_KEY", "dev-insecure-key")
 
 # Debug mode - NEVER enable in production
 # Set DJANGO_DEBUG="0" in production environment
-DEBUG = os.getenv("DJANGO_DEBUG", "1") == "1"
+DEBUG = _env("DJANGO_DEBUG", "1") == "1"
 
 
 # =============================================================================
@@ -63,18 +80,20 @@ DEBUG = os.getenv("DJANGO_DEBUG", "1") == "1"
 # =============================================================================
 
 # Parse allowed hosts from environment variable (comma-separated)
-ALLOWED_HOSTS_RAW = os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1")
+# Frozen into a tuple once at startup; Django checks it on every request.
+ALLOWED_HOSTS_RAW = _env("ALLOWED_HOSTS", "localhost,127.0.0.1")
 ALLOWED_HOSTS = (
-    ["*"]
+    ("*",)
     if ALLOWED_HOSTS_RAW.strip() == "*"
-    else [h.strip() for h in ALLOWED_HOSTS_RAW.split(",") if h.strip()]
+    else tuple(h for h in (h.strip() for h in ALLOWED_HOSTS_RAW.split(",")) if h)
 )
 
 # CSRF trusted origins for Render deployment
 # Add your custom domain here if you have one
-CSRF_TRUSTED_ORIGINS = [
+# (CsrfViewMiddleware pre-splits the wildcard entries once per process)
+CSRF_TRUSTED_ORIGINS = (
     "https://*.onrender.com",
-]
+)
 
 
 # =============================================================================
@@ -90,12 +109,22 @@ INSTALLED_APPS = [
     "django.contrib.messages",       # Messaging framework
     "django.contrib.staticfiles",    # Static files handling
     "django.contrib.sites",          # Sites framework (for password reset)
-    
-    # Third-party apps
-    "cloudinary_storage",            # Cloud storage for media files
-    "cloudinary",                    # Cloudinary integration
-    
-    # Project apps
+]
+
+# Cloudinary stores media in production only (when credentials are set).
+# Dev, tests and DEBUG runs never import or configure the SDK.
+USE_CLOUDINARY = not DEBUG and bool(_env("CLOUDINARY_CLOUD_NAME"))
+
+# Third-party apps (see quizz_app/apps.py for the SDK setup)
+if USE_CLOUDINARY:
+    INSTALLED_APPS += [
+        "cloudinary_storage",            # Cloud storage for media files
+        "cloudinary",                    # Cloudinary integration
+        "quizz_app.apps.CloudinaryConfig",  # Configures the SDK on startup
+    ]
+
+# Project apps
+INSTALLED_APPS += [
     "quizzes",                       # Main quiz application
 ]
 
@@ -110,6 +139,7 @@ SITE_ID = 1
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",        # Security headers
     "whitenoise.middleware.WhiteNoiseMiddleware",           # Serve static files
+    "quizz_app.middleware.SelectiveGZipMiddleware",         # Compress HTML/JSON (not auth pages)
     "django.contrib.sessions.middleware.SessionMiddleware", # Session handling
     "django.middleware.common.CommonMiddleware",            # Common operations
     "django.middleware.csrf.CsrfViewMiddleware",            # CSRF protection
@@ -135,7 +165,6 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],                     # Additional template directories
-        "APP_DIRS": True,               # Look for templates in app directories
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -143,6 +172,19 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # Parse each template once per process and keep the compiled
+            # version (runserver's autoreloader still clears it on edits).
+            # Listed explicitly in place of APP_DIRS so this stays true
+            # if more loaders are added later.
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",  # app templates/
+                    ],
+                ),
+            ],
         },
     }
 ]
@@ -157,10 +199,74 @@ TEMPLATES = [
 DATABASES = {
     "default": dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
-        conn_max_age=600,  # Keep database connections open for 10 minutes
+        # Keep database connections open (10 minutes unless DB_CONN_MAX_AGE
+        # says otherwise) so requests skip the TCP+TLS+auth handshake
+        conn_max_age=_env("DB_CONN_MAX_AGE", 600, cast=int),
+        conn_health_checks=True,  # Ping reused connections so a dropped one isn't handed out
     )
 }
 
+# Behind pgbouncer in transaction-pooling mode the bouncer owns the pooling:
+# close Django's connection after each request and avoid server-side
+# cursors, which don't survive being moved between backends.
+DB_PGBOUNCER = _env("DB_PGBOUNCER", "0") == "1"
+if DB_PGBOUNCER:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+# Django's native connection pool (5.1+) needs psycopg 3 + psycopg_pool.
+# Only switch it on when those are installed and pgbouncer isn't already
+# pooling (a pool in front of a pool just holds idle bouncer slots); it
+# replaces persistent connections, so CONN_MAX_AGE must be 0 when pooling.
+if (
+    not DB_PGBOUNCER
+    and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql"
+    and importlib.util.find_spec("psycopg_pool") is not None
+):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {"min_size": 1, "max_size": 5}
+
+
+# =============================================================================
+# CACHE CONFIGURATION
+# =============================================================================
+
+# Redis (set REDIS_URL; needs the `redis` package) is shared by every
+# gunicorn worker; without it each process has its own in-memory cache.
+REDIS_URL = _env("REDIS_URL", "")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# Seconds a teacher's folder dropdown stays cached. Only enabled with a shared
+# cache: signal invalidation can't reach other workers' in-memory caches.
+FOLDER_CHOICES_CACHE_TTL = 300 if REDIS_URL else 0
+
+
+# =============================================================================
+# PASSWORD HASHING
+# =============================================================================
+
+# Argon2 (argon2-cffi) is memory-hard and much cheaper in CPU than PBKDF2's
+# 1M iterations, so login/signup/password changes block a worker for less
+# time. Existing PBKDF2 hashes still verify and are re-hashed on next login.
+if importlib.util.find_spec("argon2") is not None:
+    PASSWORD_HASHERS = [
+        "django.contrib.auth.hashers.Argon2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+        "django.contrib.auth.hashers.ScryptPasswordHasher",
+    ]
+
 
 # =============================================================================
 # PASSWORD VALIDATION
@@ -191,8 +297,29 @@ USE_TZ = True              # Use timezone-aware datetimes
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
-# WhiteNoise for efficient static file serving in production
-STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
+# WhiteNoise for efficient static file serving in production.
+# Manifest storage gives every file a content-hashed name so it can be
+# cached forever; collectstatic pre-builds .gz and .br (if brotli is
+# installed) copies so nothing is compressed per request.
+# (Django 4.2+ STORAGES replaces the old STATICFILES_STORAGE and
+# DEFAULT_FILE_STORAGE settings.)
+# Media goes to Cloudinary in production only (when credentials are set),
+# see the Cloudinary section below.
+STORAGES = {
+    "default": {
+        "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage"
+        if USE_CLOUDINARY
+        else "django.core.files.storage.FileSystemStorage"
+    },
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+
+# Only the hashed copies are needed once templates use {% static %}
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
+
+# Hashed files are already served as immutable; with only hashed files kept,
+# everything else can be cached for a year too (no caching while developing)
+WHITENOISE_MAX_AGE = 0 if DEBUG else 31536000
 
 
 # =============================================================================
@@ -202,6 +329,21 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads (PDF/photo submissions up to 10 MB) always go to a temp file
+# instead of being held in worker memory when under 2.5 MB. Locally,
+# FileSystemStorage then moves the temp file into MEDIA_ROOT rather than
+# copying it; Cloudinary uploads stream from the file.
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
+
+# When running behind nginx, set this to an `internal` location aliased to
+# MEDIA_ROOT (e.g. "/internal-media/") so local media is sent by nginx via
+# X-Accel-Redirect instead of being streamed by a gunicorn worker
+MEDIA_ACCEL_REDIRECT_PREFIX = _env("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+
+# Serve local media with the async view (only worth it under ASGI - under
+# WSGI Django would run it through async_to_sync on every request)
+MEDIA_ASYNC = _env("MEDIA_ASYNC", "0") == "1"
+
 
 # =============================================================================
 # CLOUDINARY CONFIGURATION (Cloud file storage for production)
@@ -214,22 +356,13 @@ MEDIA_ROOT = BASE_DIR / "media"
 # - CLOUDINARY_API_SECRET
 
 CLOUDINARY_STORAGE = {
-    'CLOUD_NAME': os.getenv('CLOUDINARY_CLOUD_NAME', ''),
-    'API_KEY': os.getenv('CLOUDINARY_API_KEY', ''),
-    'API_SECRET': os.getenv('CLOUDINARY_API_SECRET', ''),
+    'CLOUD_NAME': _env('CLOUDINARY_CLOUD_NAME', ''),
+    'API_KEY': _env('CLOUDINARY_API_KEY', ''),
+    'API_SECRET': _env('CLOUDINARY_API_SECRET', ''),
 }
 
-# Initialize Cloudinary client
-cloudinary.config(
-    cloud_name=CLOUDINARY_STORAGE['CLOUD_NAME'],
-    api_key=CLOUDINARY_STORAGE['API_KEY'],
-    api_secret=CLOUDINARY_STORAGE['API_SECRET'],
-    secure=True  # Always use HTTPS
-)
-
-# Use Cloudinary for media files in production only (when credentials are set)
-if not DEBUG and CLOUDINARY_STORAGE['CLOUD_NAME']:
-    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# The Cloudinary client itself is configured in CloudinaryConfig.ready(),
+# and STORAGES["default"] points at MediaCloudinaryStorage when USE_CLOUDINARY
 
 
 # =============================================================================
@@ -247,37 +380,35 @@ LOGOUT_REDIRECT_URL = "/student/login/"
 # LOGGING CONFIGURATION
 # =============================================================================
 
+def _console_logger(level):
+    """Logger entry that writes straight to the console handler."""
+    return {"handlers": ["console"], "level": level, "propagate": False}
+
+
+# DEBUG logging formats every SQL query and template render; production
+# only needs INFO unless LOG_LEVEL says otherwise
+LOG_LEVEL = _env("LOG_LEVEL", "DEBUG" if DEBUG else "INFO").upper()
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "handlers": {
         "console": {
-            "class": "logging.StreamHandler",
+            # stdout writes happen on a background thread, not the request
+            "class": "quizz_app.log_handlers.QueuedConsoleHandler",
         },
     },
     "root": {
         "handlers": ["console"],
-        "level": "DEBUG",
+        "level": LOG_LEVEL,
     },
     "loggers": {
         # General Django logging
-        "django": {
-            "handlers": ["console"],
-            "level": "DEBUG",
-            "propagate": False,
-        },
+        "django": _console_logger(LOG_LEVEL),
         # Log request errors at ERROR level only
-        "django.request": {
-            "handlers": ["console"],
-            "level": "ERROR",
-            "propagate": False,
-        },
+        "django.request": _console_logger("ERROR"),
         # Email debugging
-        "django.core.mail": {
-            "handlers": ["console"],
-            "level": "DEBUG",
-            "propagate": False,
-        },
+        "django.core.mail": _console_logger("DEBUG"),
     },
 }
 
@@ -288,31 +419,64 @@ LOGGING = {
 
 # SendGrid is the preferred email provider (works on Render without issues)
 # Set SENDGRID_API_KEY in environment variables
-SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
+SENDGRID_API_KEY = _env("SENDGRID_API_KEY", "")
+
+# SMTP fallback (Brevo/Sendinblue is a good free alternative)
+EMAIL_HOST = _env("EMAIL_HOST", "smtp-relay.brevo.com")
+EMAIL_PORT = _env("EMAIL_PORT", 587, cast=int)
+EMAIL_USE_TLS = True
+EMAIL_HOST_USER = _env("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = _env("EMAIL_HOST_PASSWORD", "")
 
 if SENDGRID_API_KEY:
     # Use SendGrid API backend (bypasses SMTP, more reliable on Render)
     EMAIL_BACKEND = "quizz_app.sendgrid_backend.SendgridBackend"
-    SENDGRID_SANDBOX_MODE_IN_DEBUG = False
+elif EMAIL_HOST_USER and EMAIL_HOST_PASSWORD:
+    # SMTP with connections reused across send_mail() calls
+    EMAIL_BACKEND = "quizz_app.pooled_smtp_backend.PooledSMTPEmailBackend"
 else:
-    # Fallback to SMTP (Brevo/Sendinblue is a good free alternative)
-    EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-    EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp-relay.brevo.com")
-    EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
-    EMAIL_USE_TLS = True
-    EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
-    EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
-    
-    # If no SMTP credentials are configured, use console backend
-    # This prints emails to the terminal (useful for development)
-    if not EMAIL_HOST_USER or not EMAIL_HOST_PASSWORD:
-        EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+    # No credentials configured: print emails to the terminal
+    # (useful for development)
+    EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# PooledSMTPEmailBackend: idle connections kept per server/account, and how
+# many messages one connection may carry before it is closed and replaced
+EMAIL_POOL_SIZE = _env("EMAIL_POOL_SIZE", 5, cast=int)
+EMAIL_POOL_MAX_MESSAGES = _env("EMAIL_POOL_MAX_MESSAGES", 5000, cast=int)
+
+# Optionally send in the background so views don't block on the provider.
+# The backend picked above still does the delivery, from a worker thread.
+if _env("EMAIL_ASYNC", "0") == "1" and EMAIL_BACKEND != "django.core.mail.backends.console.EmailBackend":
+    EMAIL_ASYNC_BACKEND = EMAIL_BACKEND
+    EMAIL_BACKEND = "quizz_app.email_backends.AsyncEmailBackend"
+
+# Background threads (per process) that deliver for AsyncEmailBackend
+EMAIL_ASYNC_WORKERS = _env("EMAIL_ASYNC_WORKERS", 2, cast=int)
+
+# How many SendGrid API requests one send_messages() call may have in
+# flight at once (1 sends them one after another)
+SENDGRID_CONCURRENCY = _env("SENDGRID_CONCURRENCY", 10, cast=int)
+
+# Outgoing API requests per second, shared by every backend in the process.
+# 14/s matches the SES sandbox quota and sits well under SendGrid's.
+# Fractions (0.5 = one every two seconds) work; 0 turns limiting off.
+EMAIL_RATE_PER_SEC = _env("EMAIL_RATE_PER_SEC", 14.0, cast=float)
+
+# SendGrid dynamic templates (optional). When an id is set, emails of that
+# kind send just the template id + data instead of the rendered HTML.
+SENDGRID_TEMPLATE_IDS = {
+    name: template_id
+    for name, template_id in {
+        "password_reset": _env("SENDGRID_TEMPLATE_PASSWORD_RESET", ""),
+    }.items()
+    if template_id
+}
 
 # Site URL used in password reset emails
-SITE_URL = os.environ.get("SITE_URL", "http://127.0.0.1:8000")
+SITE_URL = _env("SITE_URL", "http://127.0.0.1:8000")
 
 # Default "from" email address for outgoing emails
-DEFAULT_FROM_EMAIL = os.getenv("EMAIL_FROM_ADDRESS", "noreply@quizfy.com")
+DEFAULT_FROM_EMAIL = _env("EMAIL_FROM_ADDRESS", "noreply@quizfy.com")
 
 
 # =============================================================================
@@ -321,7 +485,7 @@ DEFAULT_FROM_EMAIL = os.getenv("EMAIL_FROM_ADDRESS", "noreply@quizfy.com")
 
 # OpenAI API Key for AI-powered learning analytics (optional feature)
 # Get your key at: https://platform.openai.com/api-keys
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_API_KEY = _env("OPENAI_API_KEY", "")
 
 
 # =============================================================================
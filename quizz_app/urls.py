@@ -14,60 +14,19 @@ URL Structure:
 Media File Handling:
 -------------------
 Media files (user uploads like quiz images and file submissions) are served
-with a custom handler that returns 404 for missing files instead of 500.
-This gracefully handles files that were uploaded before Cloudinary was
-configured but were lost during Render redeploys.
+with a custom handler (quizz_app/media.py) that returns 404 for missing
+files instead of 500. This gracefully handles files that were uploaded
+before Cloudinary was configured but were lost during Render redeploys.
 
 Author: Quizfy Team
 =============================================================================
 """
 
-import os
-
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
-from django.views.static import serve
-from django.http import Http404
-
-
-# =============================================================================
-# CUSTOM MEDIA FILE SERVER
-# =============================================================================
 
-def safe_serve_media(request, path, document_root=None):
-    """
-    Serve media files with proper error handling.
-    
-    Returns 404 (not found) instead of 500 (server error) when a file
-    doesn't exist. This is important because:
-    
-    1. Files uploaded before Cloudinary integration may be lost after
-       Render redeploys (ephemeral filesystem)
-    2. A 404 is more informative than a 500 error
-    3. Prevents confusing error pages for users
-    
-    Args:
-        request: The HTTP request
-        path: Path to the media file (relative to MEDIA_ROOT)
-        document_root: Base directory for media files (defaults to MEDIA_ROOT)
-    
-    Returns:
-        FileResponse for the requested file
-        
-    Raises:
-        Http404: If the file doesn't exist
-    """
-    if document_root is None:
-        document_root = settings.MEDIA_ROOT
-    
-    # Build full path and check existence
-    full_path = os.path.join(document_root, path)
-    if not os.path.exists(full_path):
-        raise Http404(f"Media file not found: {path}")
-    
-    return serve(request, path, document_root=document_root)
+from .media import safe_serve_media, safe_serve_media_async
 
 
 # =============================================================================
@@ -88,15 +47,13 @@ urlpatterns = [
 # =============================================================================
 
 # Serve media files with safe error handling
-# This handles files uploaded locally (before Cloudinary) with proper 404s
+# This handles files uploaded locally (before Cloudinary) with proper 404s.
+# Under ASGI, MEDIA_ASYNC=1 streams them from the event loop instead.
+# This also covers DEBUG, so there is no separate static() media route.
 urlpatterns += [
     re_path(
         r'^media/(?P<path>.*)$', 
-        safe_serve_media, 
+        safe_serve_media_async if settings.MEDIA_ASYNC else safe_serve_media, 
         {'document_root': settings.MEDIA_ROOT}
     ),
 ]
-
-# Additional static file serving in DEBUG mode
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -20,6 +20,8 @@ Author: Quizfy Team
 """
 
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count
 from .models import (
     Quiz, Question, Submission, Answer, 
     StudentProfile, SubjectFolder, QuizAttemptPermission, FileSubmission
@@ -35,6 +37,7 @@ class QuizAdmin(admin.ModelAdmin):
     """Admin interface for Quiz model."""
     
     list_display = ('title', 'code', 'quiz_type', 'teacher', 'is_active', 'created_at')
+    list_select_related = ('teacher',)
     list_filter = ('quiz_type', 'is_active', 'created_at', 'folder')
     search_fields = ('title', 'code', 'teacher__username')
     readonly_fields = ('code', 'created_at')
@@ -58,18 +61,34 @@ class QuizAdmin(admin.ModelAdmin):
 # QUESTION ADMIN
 # =============================================================================
 
+class QuestionChangeList(ChangeList):
+    """Changelist that loads only the columns the list actually shows."""
+
+    def get_queryset(self, request, *args, **kwargs):
+        # Skip the image and option columns; quiz title/code feed Quiz.__str__
+        return super().get_queryset(request, *args, **kwargs).only(
+            'id', 'question_type', 'text', 'correct_option',
+            'quiz__id', 'quiz__title', 'quiz__code',
+        )
+
+
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     """Admin interface for Question model."""
     
     list_display = ('id', 'quiz', 'question_type', 'text_preview', 'correct_option')
+    list_select_related = ('quiz',)
     list_filter = ('question_type', 'quiz')
     search_fields = ('text', 'quiz__title')
     raw_id_fields = ('quiz',)
     
+    def get_changelist(self, request, **kwargs):
+        """Narrow the list query only; the change form still loads everything."""
+        return QuestionChangeList
+
     def text_preview(self, obj):
         """Show first 50 characters of question text."""
-        return obj.text[:50] + '...' if len(obj.text) > 50 else obj.text
+        return obj.text[:50] + '...' if obj.text[50:] else obj.text
     text_preview.short_description = 'Question Text'
 
 
@@ -85,6 +104,7 @@ class SubmissionAdmin(admin.ModelAdmin):
         'id', 'quiz', 'student_name', 'score', 'total', 
         'is_submitted', 'submitted_at'
     )
+    list_select_related = ('quiz',)
     list_filter = ('is_submitted', 'quiz', 'submitted_at')
     search_fields = ('student_name', 'student_user__username', 'quiz__title')
     readonly_fields = ('started_at', 'submitted_at', 'graded_at')
@@ -117,6 +137,7 @@ class AnswerAdmin(admin.ModelAdmin):
     """Admin interface for Answer model (read-only)."""
     
     list_display = ('id', 'submission', 'question', 'selected', 'is_correct')
+    list_select_related = ('submission__quiz', 'question')
     list_filter = ('is_correct',)
     raw_id_fields = ('submission', 'question')
     readonly_fields = ('submission', 'question', 'selected', 'is_correct')
@@ -131,6 +152,7 @@ class StudentProfileAdmin(admin.ModelAdmin):
     """Admin interface for StudentProfile model."""
     
     list_display = ('full_name', 'university_id', 'user', 'city', 'major')
+    list_select_related = ('user',)
     list_filter = ('city', 'major')
     search_fields = ('first_name', 'second_name', 'third_name', 'university_id', 'user__username')
     raw_id_fields = ('user',)
@@ -150,14 +172,20 @@ class SubjectFolderAdmin(admin.ModelAdmin):
     """Admin interface for SubjectFolder model."""
     
     list_display = ('name', 'teacher', 'quiz_count', 'created_at')
+    list_select_related = ('teacher',)
     list_filter = ('teacher', 'created_at')
     search_fields = ('name', 'teacher__username')
     ordering = ('name',)
     
+    def get_queryset(self, request):
+        """Count quizzes in the list query instead of once per row."""
+        return super().get_queryset(request).annotate(_quiz_count=Count('quizzes'))
+
     def quiz_count(self, obj):
         """Display number of quizzes in folder."""
-        return obj.quizzes.count()
+        return obj._quiz_count
     quiz_count.short_description = 'Quizzes'
+    quiz_count.admin_order_field = '_quiz_count'
 
 
 # =============================================================================
@@ -169,6 +197,7 @@ class QuizAttemptPermissionAdmin(admin.ModelAdmin):
     """Admin interface for QuizAttemptPermission model."""
     
     list_display = ('quiz', 'student_user', 'allowed_attempts')
+    list_select_related = ('quiz', 'student_user')
     list_filter = ('quiz',)
     search_fields = ('quiz__title', 'student_user__username')
     raw_id_fields = ('quiz', 'student_user')
@@ -183,6 +212,7 @@ class FileSubmissionAdmin(admin.ModelAdmin):
     """Admin interface for FileSubmission model."""
     
     list_display = ('id', 'submission', 'file_name', 'grade', 'uploaded_at', 'graded_at')
+    list_select_related = ('submission__quiz',)
     list_filter = ('uploaded_at', 'graded_at')
     search_fields = ('file_name', 'submission__student_name')
     raw_id_fields = ('submission', 'question')
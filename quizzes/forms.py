@@ -13,6 +13,7 @@ Authentication Forms:
     - StudentSignupForm     : Registration form for students
     - StudentLoginForm      : Login form for students (supports email or username)
     - ChangePasswordForm    : Password change for logged-in users
+    - QuizfyPasswordResetForm : Forgot-password email (SendGrid template aware)
 
 Quiz Management Forms:
     - QuizForm              : Create/edit quiz basic info
@@ -33,13 +34,25 @@ Author: Quizfy Team
 =============================================================================
 """
 
+import os
 import re
+import json
+import logging
 from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
 from django.contrib.auth.models import User
-from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.contrib.auth.forms import (
+    UserCreationForm, AuthenticationForm, PasswordChangeForm, PasswordResetForm
+)
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.urls import reverse
 
 from .models import Quiz, Question, StudentProfile, SubjectFolder
 
+logger = logging.getLogger(__name__)
 
 # =============================================================================
 # AUTHENTICATION FORMS - TEACHER
@@ -49,6 +62,9 @@ class TeacherLoginForm(forms.Form):
     """
     Simple login form for teachers.
     Uses username and password authentication.
+
+    Only used to render the login page; teacher_login reads the POST
+    itself.
     """
     username = forms.CharField(
         widget=forms.TextInput(attrs={
@@ -96,15 +112,30 @@ class TeacherSignupForm(forms.ModelForm):
 # AUTHENTICATION FORMS - STUDENT
 # =============================================================================
 
+# Compiled once at import instead of on every signup
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]")
+# What _generate_username may append to the base: nothing or a number
+_USERNAME_SUFFIX_RE = re.compile(r"\d*")
+
+
 def _slugify_simple(value: str) -> str:
     """
     Create a simple slug from a string.
     Removes spaces and special characters, returns lowercase alphanumeric.
     """
-    value = value.strip().lower()
-    value = re.sub(r"\s+", "", value)
-    value = re.sub(r"[^a-z0-9]", "", value)
-    return value
+    # Whitespace is non-alphanumeric too, so a single pass removes it
+    return _NON_ALNUM_RE.sub("", value.lower())
+
+
+def _username_candidates(base: str) -> Q:
+    """
+    Usernames _generate_username could produce for `base`: base, base2, ...
+
+    startswith lets the database use the username index; the regex then
+    drops unrelated longer names (e.g. "ali12" when the base is "ali1")
+    before they're sent back.
+    """
+    return Q(username__startswith=base, username__regex=rf"^{re.escape(base)}\d*$")
 
 
 class StudentSignupForm(UserCreationForm):
@@ -161,28 +192,75 @@ class StudentSignupForm(UserCreationForm):
             "password2",
         )
 
-    def clean_university_id(self):
-        """Ensure university ID is unique."""
-        uni_id = self.cleaned_data["university_id"]
-        if StudentProfile.objects.filter(university_id=uni_id).exists():
-            raise forms.ValidationError("University ID already exists.")
-        return uni_id
-
     def clean_email(self):
-        """Normalize email and ensure it's unique."""
-        email = self.cleaned_data["email"].lower()
-        if User.objects.filter(email=email).exists():
-            raise forms.ValidationError("Email already registered.")
-        return email
+        """Normalize email (uniqueness is checked in clean())."""
+        return self.cleaned_data["email"].lower()
+
+    def _base_username(self) -> str:
+        """Username stem: full name + last 3 digits of university ID."""
+        data = self.cleaned_data
+        return _slugify_simple(
+            f"{data['first_name']}{data['second_name']}{data['third_name']}{data['university_id'][-3:]}"
+        )
+
+    def clean(self):
+        """
+        Check email and university ID uniqueness, and collect taken
+        usernames, in one query.
+
+        Every profile belongs to a user, so the university ID check is a
+        join from auth_user rather than a second query. The usernames
+        sharing the generated prefix are kept for _generate_username(), so
+        save() doesn't query again.
+        """
+        cleaned_data = super().clean()
+        email = cleaned_data.get("email")
+        uni_id = cleaned_data.get("university_id")
+        needed = ("first_name", "second_name", "third_name", "university_id")
+        base = self._base_username() if all(cleaned_data.get(f) for f in needed) else None
+
+        lookup = Q()
+        if email:
+            lookup |= Q(email=email)
+        if uni_id:
+            lookup |= Q(student_profile__university_id=uni_id)
+        if base:
+            lookup |= _username_candidates(base)
+        if not lookup:
+            return cleaned_data
+
+        rows = User.objects.filter(lookup).values_list(
+            "email", "username", "student_profile__university_id"
+        )
+        self._taken_usernames = set()
+        for row_email, username, row_uni_id in rows:
+            # Flags are cleared after the first hit: one error per field is enough
+            if email and row_email == email:
+                self.add_error("email", "Email already registered.")
+                email = None
+            if uni_id and row_uni_id == uni_id:
+                self.add_error("university_id", "University ID already exists.")
+                uni_id = None
+            if base and username.startswith(base) and _USERNAME_SUFFIX_RE.fullmatch(username, len(base)):
+                self._taken_usernames.add(username)
+        return cleaned_data
 
     def _generate_username(self, base: str) -> str:
         """Generate unique username, appending numbers if needed."""
-        username = base
-        counter = 1
-        while User.objects.filter(username=username).exists():
+        # Every username sharing the prefix (fetched once, normally by
+        # clean()), then find the first free suffix in Python
+        taken = getattr(self, "_taken_usernames", None)
+        if taken is None:
+            taken = set(
+                User.objects.filter(_username_candidates(base)).values_list("username", flat=True)
+            )
+        if base not in taken:
+            return base
+
+        counter = 2
+        while f"{base}{counter}" in taken:
             counter += 1
-            username = f"{base}{counter}"
-        return username
+        return f"{base}{counter}"
 
     def save(self, commit=True):
         """
@@ -191,18 +269,14 @@ class StudentSignupForm(UserCreationForm):
         """
         user = super().save(commit=False)
 
-        first = self.cleaned_data["first_name"]
-        second = self.cleaned_data["second_name"]
-        third = self.cleaned_data["third_name"]
-        uni_id = self.cleaned_data["university_id"]
+        data = self.cleaned_data
 
         # Generate username from name + last 3 digits of university ID
-        base_username = _slugify_simple(f"{first}{second}{third}{uni_id[-3:]}")
-        user.username = self._generate_username(base_username)
+        user.username = self._generate_username(self._base_username())
 
-        user.first_name = first
-        user.last_name = f"{second} {third}"
-        user.email = self.cleaned_data["email"].lower()
+        user.first_name = data["first_name"]
+        user.last_name = f"{data['second_name']} {data['third_name']}"
+        user.email = data["email"]  # already lowercased by clean_email()
         user.is_staff = False  # Students are not staff
 
         if commit:
@@ -226,11 +300,17 @@ class StudentLoginForm(AuthenticationForm):
         """Convert email to username if email was entered."""
         identifier = (self.cleaned_data.get("username") or "").strip()
 
-        # If user entered an email, find the associated username
+        # If user entered an email, find the associated username.
+        # Student emails are stored lowercased at signup, so an exact match
+        # can use the column index (iexact would scan on UPPER(email)).
         if "@" in identifier:
-            user = User.objects.filter(email__iexact=identifier).first()
-            if user:
-                return user.username
+            username = (
+                User.objects.filter(email=identifier.lower())
+                .values_list("username", flat=True)
+                .first()
+            )
+            if username:
+                return username
 
         return identifier
 
@@ -239,17 +319,22 @@ class StudentLoginForm(AuthenticationForm):
 # PASSWORD MANAGEMENT
 # =============================================================================
 
-class ChangePasswordForm(forms.Form):
+class ChangePasswordForm(PasswordChangeForm):
     """
     Form for logged-in users to change their password.
     
     Requires:
     - Current password (for verification)
     - New password (entered twice for confirmation)
+
+    Built on Django's PasswordChangeForm, which checks the old password,
+    matches the two new ones and runs AUTH_PASSWORD_VALIDATORS; only the
+    labels/widgets and the narrower save differ.
     """
     
     old_password = forms.CharField(
         label="Current Password",
+        strip=False,
         widget=forms.PasswordInput(attrs={
             "class": "form-control",
             "placeholder": "Enter your current password",
@@ -258,6 +343,7 @@ class ChangePasswordForm(forms.Form):
     )
     new_password1 = forms.CharField(
         label="New Password",
+        strip=False,
         widget=forms.PasswordInput(attrs={
             "class": "form-control",
             "placeholder": "Enter new password",
@@ -266,6 +352,7 @@ class ChangePasswordForm(forms.Form):
     )
     new_password2 = forms.CharField(
         label="Confirm New Password",
+        strip=False,
         widget=forms.PasswordInput(attrs={
             "class": "form-control",
             "placeholder": "Confirm new password",
@@ -273,42 +360,104 @@ class ChangePasswordForm(forms.Form):
         })
     )
 
-    def __init__(self, user, *args, **kwargs):
-        """Store the user instance for password verification."""
-        self.user = user
-        super().__init__(*args, **kwargs)
-
-    def clean_old_password(self):
-        """Verify the current password is correct."""
-        old_password = self.cleaned_data.get("old_password")
-        if not self.user.check_password(old_password):
-            raise forms.ValidationError(
-                "Your old password was entered incorrectly. Please try again."
-            )
-        return old_password
-
-    def clean_new_password2(self):
-        """Ensure both new password fields match."""
-        new_password1 = self.cleaned_data.get("new_password1")
-        new_password2 = self.cleaned_data.get("new_password2")
-        
-        if new_password1 and new_password2:
-            if new_password1 != new_password2:
-                raise forms.ValidationError("The two password fields didn't match.")
-        
-        return new_password2
-
-    def save(self):
+    def save(self, commit=True):
         """Update the user's password."""
         self.user.set_password(self.cleaned_data["new_password1"])
-        self.user.save()
+        if commit:
+            # Only the hash changed - don't rewrite the whole auth_user row
+            self.user.save(update_fields=["password"])
         return self.user
 
 
+class QuizfyPasswordResetForm(PasswordResetForm):
+    """
+    Password reset form that can use a SendGrid dynamic template.
+
+    When settings.SENDGRID_TEMPLATE_IDS has a "password_reset" entry, the
+    email carries X-SG-Template / X-SG-Data headers so the SendGrid backend
+    sends only the template id and reset link. The plain-text body is still
+    rendered so any other backend delivers it as before.
+    """
+
+    def send_mail(self, subject_template_name, email_template_name, context,
+                  from_email, to_email, html_email_template_name=None):
+        if "password_reset" not in getattr(settings, "SENDGRID_TEMPLATE_IDS", {}):
+            return super().send_mail(
+                subject_template_name, email_template_name, context,
+                from_email, to_email, html_email_template_name,
+            )
+
+        subject = render_to_string(subject_template_name, context)
+        # Email subject *must not* contain newlines
+        subject = "".join(subject.splitlines())
+        body = render_to_string(email_template_name, context)
+
+        reset_path = reverse(
+            "password_reset_confirm",
+            kwargs={"uidb64": context["uid"], "token": context["token"]},
+        )
+        template_data = {
+            "subject": subject,
+            "username": context["user"].get_username(),
+            "site_name": context["site_name"],
+            "reset_url": f"{context['protocol']}://{context['domain']}{reset_path}",
+        }
+
+        email_message = EmailMultiAlternatives(
+            subject, body, from_email, [to_email],
+            headers={
+                "X-SG-Template": "password_reset",
+                "X-SG-Data": json.dumps(template_data),
+            },
+        )
+        try:
+            email_message.send()
+        except Exception:
+            logger.exception("Failed to send password reset email to %s", context["user"].pk)
+
+
 # =============================================================================
 # QUIZ MANAGEMENT FORMS
 # =============================================================================
 
+def folder_choices_cache_key(teacher_id):
+    """Cache key for a teacher's folder dropdown (see signals.py)."""
+    return f"folders:{teacher_id}"
+
+
+def get_folder_choices(teacher):
+    """
+    [(pk, label), ...] for the teacher's folders, ordered by name.
+
+    Cached for FOLDER_CHOICES_CACHE_TTL seconds (when a shared cache is
+    configured) and dropped whenever one of the teacher's folders is saved
+    or deleted. Labels match SubjectFolder.__str__.
+    """
+    ttl = getattr(settings, "FOLDER_CHOICES_CACHE_TTL", 0)
+    key = folder_choices_cache_key(teacher.pk)
+    choices = cache.get(key) if ttl else None
+    if choices is None:
+        choices = [
+            (pk, f"{name} ({teacher.username})")
+            for pk, name in teacher.folders.order_by("name").values_list("pk", "name")
+        ]
+        if ttl:
+            cache.set(key, choices, ttl)
+    return choices
+
+
+def _set_folder_field(field, teacher):
+    """
+    Limit a folder ModelChoiceField to the teacher's folders.
+
+    The options come from get_folder_choices(), so rendering doesn't run
+    the ModelChoiceField query. The queryset is still used to validate
+    the submitted pk.
+    """
+    field.queryset = teacher.folders.all()
+    field.choices = [("", field.empty_label)] + get_folder_choices(teacher)
+
+
 class QuizForm(forms.ModelForm):
     """
     Form for creating a new quiz.
@@ -322,18 +471,19 @@ class QuizForm(forms.ModelForm):
     class Meta:
         model = Quiz
         fields = ["title", "quiz_type", "folder"]
+        widgets = {
+            "title": forms.TextInput(attrs={"placeholder": "Quiz title"}),
+            "quiz_type": forms.Select(attrs={"class": "quiz-type-select"}),
+        }
 
     def __init__(self, *args, **kwargs):
         # Pop teacher from kwargs before calling super()
         teacher = kwargs.pop("teacher", None)
         super().__init__(*args, **kwargs)
 
-        self.fields["title"].widget.attrs.update({"placeholder": "Quiz title"})
-        self.fields["quiz_type"].widget.attrs.update({"class": "quiz-type-select"})
-
         # Filter folders to only show this teacher's folders
         if teacher:
-            self.fields["folder"].queryset = teacher.folders.all()
+            _set_folder_field(self.fields["folder"], teacher)
 
 
 class QuizSettingsForm(forms.ModelForm):
@@ -363,6 +513,18 @@ class QuizSettingsForm(forms.ModelForm):
 # QUESTION FORMS
 # =============================================================================
 
+# Answer choices shown for each question type
+_MCQ_CHOICES = ((1, 'Option 1'), (2, 'Option 2'), (3, 'Option 3'), (4, 'Option 4'))
+_TF_CHOICES = ((1, 'True'), (2, 'False'))
+
+# Columns the type-specific question forms may change on an existing question
+# (everything but the quiz it belongs to)
+_QUESTION_EDIT_FIELDS = [
+    "question_type", "text", "image",
+    "option1", "option2", "option3", "option4", "correct_option",
+]
+
+
 class QuestionForm(forms.ModelForm):
     """
     Form for creating Multiple Choice questions.
@@ -374,6 +536,11 @@ class QuestionForm(forms.ModelForm):
     - Correct answer selection
     """
     
+    # Simplified correct answer choices for multiple choice
+    correct_option = forms.TypedChoiceField(
+        coerce=int, choices=_MCQ_CHOICES, initial=1, label="Correct option"
+    )
+
     class Meta:
         model = Question
         fields = [
@@ -391,16 +558,6 @@ class QuestionForm(forms.ModelForm):
                 "placeholder": "Enter your question"
             }),
         }
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Simplify correct answer choices for multiple choice
-        self.fields["correct_option"].choices = [
-            (1, 'Option 1'), 
-            (2, 'Option 2'), 
-            (3, 'Option 3'), 
-            (4, 'Option 4')
-        ]
 
 
 class TrueFalseQuestionForm(forms.ModelForm):
@@ -413,6 +570,11 @@ class TrueFalseQuestionForm(forms.ModelForm):
     - question_type = "true_false"
     """
     
+    # Only show True/False options
+    correct_option = forms.TypedChoiceField(
+        coerce=int, choices=_TF_CHOICES, initial=1, label="Correct Answer"
+    )
+
     class Meta:
         model = Question
         fields = ["text", "image", "correct_option"]
@@ -423,25 +585,19 @@ class TrueFalseQuestionForm(forms.ModelForm):
             }),
         }
     
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Only show True/False options
-        self.fields["correct_option"].choices = [
-            (1, 'True'), 
-            (2, 'False')
-        ]
-        self.fields["correct_option"].label = "Correct Answer"
-    
     def save(self, commit=True):
         """Save with true/false question type and preset options."""
         instance = super().save(commit=False)
         instance.question_type = 'true_false'
         instance.option1 = 'True'
         instance.option2 = 'False'
-        instance.option3 = ''
-        instance.option4 = ''
+        if instance.pk:
+            # Editing an existing question: clear options it may still carry
+            # (new rows already get '' from the model defaults)
+            instance.option3 = ''
+            instance.option4 = ''
         if commit:
-            instance.save()
+            instance.save(update_fields=_QUESTION_EDIT_FIELDS if instance.pk else None)
         return instance
 
 
@@ -467,13 +623,16 @@ class FileUploadQuestionForm(forms.ModelForm):
         """Save with file_upload question type."""
         instance = super().save(commit=False)
         instance.question_type = 'file_upload'
-        instance.option1 = ''
-        instance.option2 = ''
-        instance.option3 = ''
-        instance.option4 = ''
-        instance.correct_option = 1  # Default value (not used for file uploads)
+        if instance.pk:
+            # Editing an existing question: reset the unused answer fields
+            # (new rows already get ''/1 from the model defaults)
+            instance.option1 = ''
+            instance.option2 = ''
+            instance.option3 = ''
+            instance.option4 = ''
+            instance.correct_option = 1  # Not used for file uploads
         if commit:
-            instance.save()
+            instance.save(update_fields=_QUESTION_EDIT_FIELDS if instance.pk else None)
         return instance
 
 
@@ -496,6 +655,37 @@ class EnterQuizForm(forms.Form):
     )
 
 
+# Upload limits for student file answers
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB in bytes
+_ALLOWED_UPLOAD_EXTS = frozenset({"pdf", "jpg", "jpeg", "png"})
+# Leading bytes of each allowed format (PDF, JPEG, PNG)
+_UPLOAD_MAGIC = (b"%PDF-", b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n")
+
+
+def validate_upload(file):
+    """
+    Check a student's answer file: at most 10MB, a PDF/JPG/PNG name, and
+    content that really starts like one of those formats (a renamed .zip
+    or .exe shouldn't get through on its extension alone).
+
+    Used by FileUploadSubmissionForm and by both upload branches of
+    _finalize_submission (whole-quiz and per-question files).
+    Raises ValidationError with a message fit to show the student.
+    """
+    if file.size > MAX_UPLOAD_SIZE:
+        raise forms.ValidationError("File size must be under 10MB", code="file_too_large")
+
+    ext = os.path.splitext(file.name)[1][1:].lower()
+    if ext not in _ALLOWED_UPLOAD_EXTS:
+        raise forms.ValidationError("Only PDF, JPG, and PNG files are allowed", code="invalid_type")
+
+    # Rewind afterwards so storage saves the whole file
+    header = file.read(8)
+    file.seek(0)
+    if not header.startswith(_UPLOAD_MAGIC):
+        raise forms.ValidationError("Only PDF, JPG, and PNG files are allowed", code="invalid_type")
+
+
 class FileUploadSubmissionForm(forms.Form):
     """
     Form for students to upload files for file-type questions.
@@ -514,16 +704,7 @@ class FileUploadSubmissionForm(forms.Form):
         """Validate file size and type."""
         file = self.cleaned_data.get('file')
         if file:
-            # Check file size (10MB max)
-            max_size = 10 * 1024 * 1024  # 10MB in bytes
-            if file.size > max_size:
-                raise forms.ValidationError("File size must be under 10MB")
-            
-            # Check file extension
-            ext = file.name.split('.')[-1].lower()
-            allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png']
-            if ext not in allowed_extensions:
-                raise forms.ValidationError("Only PDF, JPG, and PNG files are allowed")
+            validate_upload(file)
         return file
 
 
@@ -555,10 +736,13 @@ class MoveQuizForm(forms.Form):
     - Select a folder to move the quiz into
     - Select "Ungrouped" to remove from any folder
     """
-    folder = forms.ModelChoiceField(
-        queryset=SubjectFolder.objects.none(),
+    # Plain (pk, label) choices rather than a ModelChoiceField: rendering
+    # and validation both work off the list, with no queryset and no
+    # SubjectFolder instances. cleaned_data["folder"] is a pk or None.
+    folder = forms.TypedChoiceField(
+        coerce=int,
+        empty_value=None,
         required=False,
-        empty_label="— Ungrouped —",
         label="Move to folder",
     )
 
@@ -567,8 +751,6 @@ class MoveQuizForm(forms.Form):
         teacher = kwargs.pop("teacher", None)
         super().__init__(*args, **kwargs)
 
-        # Filter folders to only show this teacher's folders
-        if teacher:
-            self.fields["folder"].queryset = SubjectFolder.objects.filter(
-                teacher=teacher
-            ).order_by("name")
\ No newline at end of file
+        # Only this teacher's folders are offered (and therefore accepted)
+        options = get_folder_choices(teacher) if teacher else []
+        self.fields["folder"].choices = [("", "— Ungrouped —")] + options
\ No newline at end of file
@@ -0,0 +1,21 @@
+# auth_user.email has no index of its own, but student login (email -> username)
+# and signup (duplicate email check) both look users up by it. auth.User's Meta
+# can't be changed from here, so the index is created with plain SQL.
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quizzes', '0012_add_submission_grading_fields'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS quizzes_auth_user_email_idx ON auth_user (email);',
+            reverse_sql='DROP INDEX IF EXISTS quizzes_auth_user_email_idx;',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Case-insensitive email lookups (email__iexact, e.g. the password reset form
+# finding the account for an address) compare UPPER(email) on PostgreSQL.
+# An expression index on the same expression turns those scans into index
+# lookups. Not UNIQUE: existing accounts (teachers, admins with blank
+# emails) may legitimately share a value.
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quizzes', '0013_auth_user_email_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS quizzes_auth_user_email_upper_idx ON auth_user (UPPER(email));',
+            reverse_sql='DROP INDEX IF EXISTS quizzes_auth_user_email_upper_idx;',
+        ),
+    ]
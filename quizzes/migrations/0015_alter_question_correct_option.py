@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0014_auth_user_email_upper_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='correct_option',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Option 1 / True'), (2, 'Option 2 / False'), (3, 'Option 3'), (4, 'Option 4')], default=1),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0016_quiz_submission_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='answer',
+            name='selected',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='The option number selected (1-4)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['submission', 'question'], name='answer_submission_question_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0018_submission_student_recent_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='submission',
+            name='submission_quiz_submitted_idx',
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('is_submitted', True)), fields=['quiz', '-submitted_at', '-id'], name='submission_quiz_done_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0019_submission_quiz_done_partial_index'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='question',
+            constraint=models.CheckConstraint(condition=models.Q(('correct_option__gte', 1), ('correct_option__lte', 4)), name='question_correct_option_1_to_4'),
+        ),
+        migrations.AddConstraint(
+            model_name='answer',
+            constraint=models.CheckConstraint(condition=models.Q(('selected__isnull', True), models.Q(('selected__gte', 1), ('selected__lte', 4)), _connector='OR'), name='answer_selected_1_to_4'),
+        ),
+    ]
@@ -20,26 +20,31 @@ Author: Quizfy Team
 =============================================================================
 """
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
-from django.core.validators import RegexValidator
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+import logging
 import secrets
-import qrcode
-from io import BytesIO
-import base64
+
+logger = logging.getLogger(__name__)
 
 
 # =============================================================================
 # VALIDATORS
 # =============================================================================
 
-# Validator for university ID - must contain only digits
-numeric_only = RegexValidator(
-    regex=r'^\d+$',
-    message='University ID must contain digits only'
-)
+def numeric_only(value):
+    """
+    Validator for university ID - must contain only digits.
+
+    str.isdecimal() accepts the same characters as the old digits-only
+    RegexValidator (any Unicode decimal digit, so Arabic-Indic digits
+    still pass) without running the regex engine.
+    """
+    if not value.isdecimal():
+        raise ValidationError('University ID must contain digits only', code='invalid')
 
 
 # =============================================================================
@@ -51,7 +56,7 @@ def question_image_upload_path(instance, filename):
     Generate upload path for question images.
     Path: quiz_images/quiz_{quiz_id}/{filename}
     """
-    return f'quiz_images/quiz_{instance.quiz.id}/{filename}'
+    return f'quiz_images/quiz_{instance.quiz_id}/{filename}'
 
 
 def file_submission_upload_path(instance, filename):
@@ -59,8 +64,10 @@ def file_submission_upload_path(instance, filename):
     Generate upload path for student file submissions.
     Path: file_submissions/quiz_{quiz_id}/{student_id}/{filename}
     """
-    student_id = instance.submission.student_user.id if instance.submission.student_user else "anon"
-    return f'file_submissions/quiz_{instance.submission.quiz.id}/{student_id}/{filename}'
+    # FK *_id columns only: no extra SELECTs for the quiz or student per upload
+    submission = instance.submission
+    student_id = submission.student_user_id or "anon"
+    return f'file_submissions/quiz_{submission.quiz_id}/{student_id}/{filename}'
 
 
 def teacher_feedback_file_path(instance, filename):
@@ -76,14 +83,19 @@ def teacher_feedback_upload_path(instance, filename):
     Generate upload path for teacher feedback files on FileSubmission objects.
     Path: teacher_feedback/quiz_{quiz_id}/{student_id}/{filename}
     """
-    student_id = instance.submission.student_user.id if instance.submission.student_user else "anon"
-    return f'teacher_feedback/quiz_{instance.submission.quiz.id}/{student_id}/{filename}'
+    submission = instance.submission
+    student_id = submission.student_user_id or "anon"
+    return f'teacher_feedback/quiz_{submission.quiz_id}/{student_id}/{filename}'
 
 
 # =============================================================================
 # QUIZ MODEL
 # =============================================================================
 
+# How many random quiz codes to try before giving up on a save
+QUIZ_CODE_ATTEMPTS = 5
+
+
 class Quiz(models.Model):
     """
     Represents a quiz created by a teacher.
@@ -162,45 +174,65 @@ class Quiz(models.Model):
         verbose_name = "Quiz"
         verbose_name_plural = "Quizzes"
         ordering = ['-created_at']
+        indexes = [
+            # "My quizzes" lists: filter by teacher, already in default order
+            models.Index(fields=['teacher', '-created_at'], name='quiz_teacher_created_idx'),
+        ]
 
-    def is_expired(self):
-        """Check if the quiz has passed its due date."""
-        return self.due_at is not None and timezone.now() > self.due_at
+    def is_expired(self, now=None):
+        """
+        Check if the quiz has passed its due date.
+        Views that already took `now` for the request can pass it in.
+        """
+        if self.due_at is None:
+            return False
+        return (now or timezone.now()) > self.due_at
 
-    def can_start(self):
+    def can_start(self, now=None):
         """
         Check if students can start this quiz.
         Returns True only if:
         - Teacher hasn't stopped the quiz (is_active=True)
         - Quiz hasn't expired (due_at not passed)
         """
-        return self.is_active and not self.is_expired()
+        return self.is_active and not self.is_expired(now)
 
     def get_qr_code_base64(self):
         """
         Generate a QR code that points to the quiz URL.
         Returns base64-encoded PNG image or empty string on error.
+
+        The image only depends on the (immutable) quiz code, so it is
+        memoized per process in quizzes.qr.
         """
+        from .qr import qr_data_uri
+
         try:
-            qr_data = f"/quiz/{self.code}/"
-            qr = qrcode.QRCode(version=1, box_size=10, border=2)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            buffer.seek(0)
-            img_base64 = base64.b64encode(buffer.read()).decode()
-            return f"data:image/png;base64,{img_base64}"
-        except Exception as e:
-            print(f"QR Code generation error for {self.code}: {e}")
+            return qr_data_uri(f"/quiz/{self.code}/")
+        except (OSError, ValueError):
+            # ValueError covers segno's DataOverflowError / unencodable data;
+            # anything else is a real bug and should surface as one.
+            # Goes through the queued console handler (see LOGGING), with traceback
+            logger.exception("QR Code generation error for %s", self.code)
             return ""
 
     def save(self, *args, **kwargs):
         """Auto-generate a unique 6-character code if not provided."""
-        if not self.code:
-            self.code = secrets.token_hex(3).upper()
-        super().save(*args, **kwargs)
+        if self.code:
+            return super().save(*args, **kwargs)
+
+        # A random code can (rarely) collide with an existing one. The UNIQUE
+        # constraint catches that, so just draw again; the savepoint keeps an
+        # enclosing transaction usable after the failed INSERT.
+        for attempt in range(QUIZ_CODE_ATTEMPTS):
+            # Uppercase hex, formatted in one step (views match codes upper-cased)
+            self.code = f"{secrets.randbits(24):06X}"
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == QUIZ_CODE_ATTEMPTS - 1:
+                    raise
 
     def __str__(self):
         return f"{self.title} - {self.code}"
@@ -257,7 +289,8 @@ class Question(models.Model):
     option4 = models.CharField(max_length=60, blank=True, default='')
     
     # Correct answer (1-4 for multiple choice, 1=True/2=False for true/false)
-    correct_option = models.IntegerField(
+    # Small int: the value never exceeds 4
+    correct_option = models.PositiveSmallIntegerField(
         choices=[
             (1, 'Option 1 / True'),
             (2, 'Option 2 / False'),
@@ -269,15 +302,19 @@ class Question(models.Model):
 
     class Meta:
         ordering = ['id']
+        constraints = [
+            # Same range as the choices above, enforced by the database too
+            models.CheckConstraint(
+                condition=models.Q(correct_option__gte=1, correct_option__lte=4),
+                name='question_correct_option_1_to_4',
+            ),
+        ]
 
     def option_text(self, number):
         """Get the text for a specific option number (1-4)."""
-        return {
-            1: self.option1,
-            2: self.option2,
-            3: self.option3,
-            4: self.option4,
-        }.get(number, "(blank)")
+        if number in (1, 2, 3, 4):
+            return (self.option1, self.option2, self.option3, self.option4)[number - 1]
+        return "(blank)"
 
     def __str__(self):
         return self.text[:60] if self.text else f"Question {self.id}"
@@ -365,6 +402,18 @@ class Submission(models.Model):
 
     class Meta:
         ordering = ['-submitted_at', '-id']
+        indexes = [
+            # A quiz's finished submissions in default order (results, exports,
+            # analytics all filter is_submitted=True). Partial, so in-progress
+            # attempts stay out of it; backends without partial indexes skip it.
+            models.Index(
+                fields=['quiz', '-submitted_at', '-id'],
+                condition=models.Q(is_submitted=True),
+                name='submission_quiz_done_idx',
+            ),
+            # A student's history on the dashboard, newest first
+            models.Index(fields=['student_user', '-submitted_at'], name='submission_student_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student_name} - {self.quiz.code} ({self.score}/{self.total})"
@@ -389,7 +438,7 @@ class Answer(models.Model):
         Question, 
         on_delete=models.CASCADE
     )
-    selected = models.IntegerField(
+    selected = models.PositiveSmallIntegerField(
         null=True, 
         blank=True,
         help_text="The option number selected (1-4)"
@@ -398,6 +447,17 @@ class Answer(models.Model):
 
     class Meta:
         ordering = ['question__id']
+        indexes = [
+            # A submission's answers, looked up/ordered by question
+            models.Index(fields=['submission', 'question'], name='answer_submission_question_idx'),
+        ]
+        constraints = [
+            # No answer (NULL) or one of the four options
+            models.CheckConstraint(
+                condition=models.Q(selected__isnull=True) | models.Q(selected__gte=1, selected__lte=4),
+                name='answer_selected_1_to_4',
+            ),
+        ]
 
 
 # =============================================================================
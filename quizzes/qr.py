@@ -0,0 +1,70 @@
+"""
+=============================================================================
+Quizfy QR Codes
+=============================================================================
+
+QR code images for quiz join links.
+
+A quiz code never changes once it's created, so the image for a given
+URL never changes either. Results are memoized per process: the first
+request for a quiz pays for the encode + PNG write, and every later one
+(teacher reloads the projector page, several tabs, ...) is a dict lookup.
+
+Functions:
+----------
+- qr_png(data)      : PNG bytes for `data`
+- qr_data_uri(data) : The same PNG as a data:image/png;base64 URI
+- qr_etag(data)     : Strong ETag for qr_png(data), for browser revalidation
+
+Author: Quizfy Team
+=============================================================================
+"""
+
+import base64
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+
+# A few hundred quizzes' worth of small PNGs (~1 KB each)
+QR_CACHE_SIZE = 512
+
+# How long (seconds) browsers may reuse a QR image without asking again
+QR_MAX_AGE = 24 * 60 * 60
+
+# Module size in pixels and quiet-zone width in modules
+QR_BOX_SIZE = 10
+QR_BORDER = 2
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_png(data):
+    """Render `data` as a black-on-white QR code PNG."""
+    # Imported here so only the QR endpoints pay for loading it
+    import segno
+
+    # segno builds the matrix and writes the 1-bit PNG itself (no Pillow).
+    # make_qr() never picks a Micro QR, which some phone scanners can't read;
+    # error level M and the smallest fitting version match what qrcode did.
+    qr = segno.make_qr(data, error="m", boost_error=False)
+
+    buffer = BytesIO()
+    qr.save(buffer, kind="png", scale=QR_BOX_SIZE, border=QR_BORDER)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_data_uri(data):
+    """qr_png(data) as a data URI, ready for an <img src>."""
+    return "data:image/png;base64," + base64.b64encode(qr_png(data)).decode()
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_etag(data):
+    """
+    ETag for qr_png(data).
+
+    Hashed from the PNG itself rather than the quiz code, so a change in
+    how images are rendered (scale, encoder) invalidates cached copies.
+    """
+    return f'"{hashlib.blake2b(qr_png(data), digest_size=8).hexdigest()}"'
@@ -7,7 +7,9 @@ This module contains Django signal handlers for the Quizfy application.
 
 Signals:
 --------
-- create_default_site : Ensures a Site object exists for password reset emails
+- create_default_site       : Ensures a Site object exists for password reset emails
+- invalidate_folder_choices : Drops a teacher's cached folder dropdown when
+                              one of their folders changes
 
 Why Signals?
 ------------
@@ -26,10 +28,15 @@ Author: Quizfy Team
 
 import logging
 
-from django.db.models.signals import post_migrate
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db.models.signals import post_migrate, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.sites.models import Site
 
+from .forms import folder_choices_cache_key
+from .models import SubjectFolder
+
 
 # =============================================================================
 # LOGGING SETUP
@@ -66,21 +73,36 @@ def create_default_site(sender, **kwargs):
         **kwargs: Additional signal arguments
     """
     # Only run for the sites app to avoid running multiple times
-    if sender.name == 'django.contrib.sites':
-        try:
-            # Get or create the default site (pk=1 matches SITE_ID)
-            site, created = Site.objects.get_or_create(
-                pk=1,
-                defaults={
-                    'domain': 'example.com',  # Update in admin for production
-                    'name': 'Quizfy Platform'
-                }
-            )
-            
-            if created:
-                logger.info(f"[SITE] Created default site: {site.domain}")
-            else:
-                logger.debug(f"[SITE] Site already exists: {site.domain} ({site.name})")
-                
-        except Exception as e:
-            logger.error(f"[SITE] Error configuring site: {e}")
+    if sender.name != 'django.contrib.sites':
+        return
+
+    try:
+        # Get or create the default site (pk=1 matches SITE_ID) on the
+        # database being migrated. Already there: a single SELECT.
+        site, created = Site.objects.using(kwargs.get("using", DEFAULT_DB_ALIAS)).get_or_create(
+            pk=1,
+            defaults={
+                'domain': 'example.com',  # Update in admin for production
+                'name': 'Quizfy Platform'
+            }
+        )
+    except DatabaseError as e:
+        # e.g. the sites table isn't there yet - don't fail the whole migrate.
+        # Anything else is a real bug and should surface.
+        logger.error(f"[SITE] Error configuring site: {e}")
+        return
+
+    if created:
+        logger.info(f"[SITE] Created default site: {site.domain}")
+    else:
+        logger.debug(f"[SITE] Site already exists: {site.domain} ({site.name})")
+
+
+@receiver(post_save, sender=SubjectFolder)
+@receiver(post_delete, sender=SubjectFolder)
+def invalidate_folder_choices(sender, instance, **kwargs):
+    """
+    Forget the teacher's cached folder choices (see forms.get_folder_choices)
+    after a folder is created, renamed or deleted.
+    """
+    cache.delete(folder_choices_cache_key(instance.teacher_id))
@@ -2,6 +2,13 @@ from django import template
 
 register = template.Library()
 
+# Every accepted answer key -> the Question field holding its text
+_OPTION_FIELDS = {
+    key: f"option{n}"
+    for n, letter in enumerate("ABCD", start=1)
+    for key in (letter, str(n), f"option{n}")
+}
+
 @register.filter
 def get_item(d, key):
     """Safely get dict item by key in templates."""
@@ -34,20 +41,6 @@ def option_text(question, key):
     if isinstance(opts, dict):
         return opts.get(k, "") or opts.get(k.upper(), "") or ""
 
-    # 2) Normal DB fields option1..option4
-    mapping = {
-        "A": getattr(question, "option1", ""),
-        "B": getattr(question, "option2", ""),
-        "C": getattr(question, "option3", ""),
-        "D": getattr(question, "option4", ""),
-        "1": getattr(question, "option1", ""),
-        "2": getattr(question, "option2", ""),
-        "3": getattr(question, "option3", ""),
-        "4": getattr(question, "option4", ""),
-        "option1": getattr(question, "option1", ""),
-        "option2": getattr(question, "option2", ""),
-        "option3": getattr(question, "option3", ""),
-        "option4": getattr(question, "option4", ""),
-    }
-
-    return mapping.get(k, "") or mapping.get(k.upper(), "") or ""
+    # 2) Normal DB fields option1..option4 (only the one asked for is read)
+    field = _OPTION_FIELDS.get(k) or _OPTION_FIELDS.get(k.upper())
+    return (getattr(question, field, "") or "") if field else ""
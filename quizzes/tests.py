@@ -1,3 +1,182 @@
-from django.test import TestCase
+import base64
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from quizz_app.email_backends import SendGridEmailBackend, _TokenBucket
+from quizzes.models import FileSubmission, Question, Quiz, StudentProfile
+
+
+# =============================================================================
+# SENDGRID BACKEND
+# =============================================================================
+
+class _FakeResponse:
+    status_code = 202
+    body = b""
+
+
+class _FakeClient:
+    """Stands in for SendGridAPIClient and records each request payload."""
+
+    def __init__(self):
+        self.payloads = []
+
+    def send(self, sg_mail):
+        self.payloads.append(sg_mail.get())
+        return _FakeResponse()
+
+
+class SendGridBackendTests(SimpleTestCase):
+    """What actually goes over the wire for batched and single sends."""
+
+    def setUp(self):
+        self.backend = SendGridEmailBackend(api_key="test-key")
+        self.client = self.backend._sg = _FakeClient()
+
+    def _message(self, to, **kwargs):
+        return EmailMessage("Results", "Your quiz was graded.", "teacher@quizfy.com", [to], **kwargs)
+
+    def test_identical_messages_share_one_request(self):
+        sent = self.backend.send_messages([self._message("a@x.com"), self._message("b@x.com")])
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(self.client.payloads), 1)
+        recipients = [p["to"] for p in self.client.payloads[0]["personalizations"]]
+        self.assertCountEqual(recipients, [[{"email": "a@x.com"}], [{"email": "b@x.com"}]])
+
+    def test_cc_and_attachment_are_sent(self):
+        plain = self._message("a@x.com")
+        extras = self._message(
+            "b@x.com", cc=["c@x.com"], bcc=["d@x.com"], reply_to=["office@quizfy.com"],
+            headers={"X-Quiz": "ABC123"},
+        )
+        extras.attach("grades.csv", "name,score\nSara,9\n", "text/csv")
+
+        sent = self.backend.send_messages([plain, extras])
+
+        # The message with extras must not be merged into the plain one
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(self.client.payloads), 2)
+        payload = next(p for p in self.client.payloads if "attachments" in p)
+
+        personalization = payload["personalizations"][0]
+        self.assertEqual(personalization["to"], [{"email": "b@x.com"}])
+        self.assertEqual(personalization["cc"], [{"email": "c@x.com"}])
+        self.assertEqual(personalization["bcc"], [{"email": "d@x.com"}])
+        self.assertEqual(payload["reply_to"], {"email": "office@quizfy.com"})
+        self.assertEqual(payload["headers"], {"X-Quiz": "ABC123"})
+        self.assertEqual(payload["attachments"], [{
+            "content": base64.b64encode(b"name,score\nSara,9\n").decode(),
+            "type": "text/csv",
+            "filename": "grades.csv",
+            "disposition": "attachment",
+        }])
+
+
+# =============================================================================
+# EMAIL RATE LIMITING
+# =============================================================================
+
+class _FakeClock:
+    """Replaces the `time` module in email_backends; sleep() just moves the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTests(SimpleTestCase):
+    """acquire() must always return, whatever EMAIL_RATE_PER_SEC is set to."""
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        patcher = mock.patch("quizz_app.email_backends.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fractional_rate_sends_one_every_interval(self):
+        bucket = _TokenBucket(0.5)
+
+        bucket.acquire()  # Starts with one whole token
+        self.assertEqual(self.clock.slept, [])
+
+        bucket.acquire()  # Then one every 2 seconds
+        self.assertAlmostEqual(sum(self.clock.slept), 2.0)
+
+    def test_zero_or_negative_rate_disables_limiting(self):
+        for rate in (0, -1):
+            bucket = _TokenBucket(rate)
+            for _ in range(50):
+                bucket.acquire()
+        self.assertEqual(self.clock.slept, [])
+
+
+# =============================================================================
+# FILE UPLOAD ANSWERS
+# =============================================================================
+
+class TakeQuizUploadTests(TestCase):
+    """Uploads posted to take_quiz are checked by content, not just by name."""
+
+    ZIP_BYTES = b"PK\x03\x04" + b"\x00" * 26
+    PDF_BYTES = b"%PDF-1.4\n%%EOF\n"
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        teacher = User.objects.create_user("teacher", is_staff=True)
+        student = User.objects.create_user("student")
+        StudentProfile.objects.create(
+            user=student, first_name="Sara", second_name="Mohamed",
+            third_name="Farag", university_id="20240001",
+        )
+        self.client.force_login(student)
+
+        self.file_quiz = Quiz.objects.create(teacher=teacher, title="Essay", quiz_type="file_upload")
+        self.mixed_quiz = Quiz.objects.create(teacher=teacher, title="Lab", quiz_type="multiple_choice")
+        self.upload_question = Question.objects.create(
+            quiz=self.mixed_quiz, text="Upload your lab report", question_type="file_upload",
+        )
+
+    def _post(self, quiz, field, name, content):
+        return self.client.post(
+            f"/quiz/{quiz.code}/", {field: SimpleUploadedFile(name, content)}
+        )
+
+    def test_renamed_zip_is_rejected(self):
+        cases = (
+            (self.file_quiz, "file"),
+            (self.mixed_quiz, f"file_{self.upload_question.id}"),
+        )
+        for quiz, field in cases:
+            with self.subTest(quiz=quiz.quiz_type):
+                response = self._post(quiz, field, "homework.pdf", self.ZIP_BYTES)
+
+                # Sent back to the quiz, nothing stored, attempt still open
+                self.assertRedirects(response, f"/quiz/{quiz.code}/", fetch_redirect_response=False)
+                self.assertFalse(FileSubmission.objects.exists())
+                self.assertFalse(quiz.submissions.filter(is_submitted=True).exists())
+
+    def test_real_pdf_is_accepted(self):
+        self._post(self.file_quiz, "file", "homework.pdf", self.PDF_BYTES)
+
+        upload = FileSubmission.objects.get()
+        with upload.file.open("rb") as stored:
+            self.assertEqual(stored.read(), self.PDF_BYTES)
@@ -30,6 +30,7 @@ from django.contrib.auth import views as auth_views
 from django.http import HttpResponse
 
 from . import views
+from .forms import QuizfyPasswordResetForm
 
 
 # =============================================================================
@@ -296,6 +297,7 @@ urlpatterns = [
             template_name="quizzes/auth/password_reset_form.html",
             email_template_name="quizzes/auth/password_reset_email.html",
             subject_template_name="quizzes/auth/password_reset_subject.txt",
+            form_class=QuizfyPasswordResetForm,
             success_url=reverse_lazy("password_reset_done"),
         ),
         name="password_reset",
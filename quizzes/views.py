@@ -93,9 +93,12 @@ from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from django.views.decorators.http import require_POST
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 
 # Third-party imports
@@ -103,8 +106,6 @@ from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.worksheet.table import Table, TableStyleInfo
-import qrcode
-from io import BytesIO
 
 # Python standard library
 import json
@@ -121,8 +122,10 @@ from .forms import (
     TeacherLoginForm, TeacherSignupForm, QuizForm, QuestionForm,
     EnterQuizForm, StudentSignupForm, StudentLoginForm, FolderForm,
     MoveQuizForm, QuizSettingsForm, ChangePasswordForm,
-    TrueFalseQuestionForm, FileUploadSubmissionForm, FileUploadQuestionForm
+    TrueFalseQuestionForm, FileUploadSubmissionForm, FileUploadQuestionForm,
+    validate_upload,
 )
+from .qr import QR_MAX_AGE, qr_etag, qr_png
 
 
 # =============================================================================
@@ -205,17 +208,17 @@ def quiz_qr_code(request, quiz_code):
         domain = request.get_host()
         qr_data = f"{protocol}://{domain}/quiz/{quiz.code}/join/"
         
-        qr = qrcode.QRCode(version=1, box_size=10, border=2)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Serve as PNG
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        
-        return HttpResponse(buffer.getvalue(), content_type="image/png")
+        # A quiz's QR never changes, so the browser keeps it for a day and
+        # then revalidates with If-None-Match (304, no body)
+        etag = qr_etag(qr_data)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            # Serve as PNG (rendered once per URL, then memoized - see quizzes/qr.py)
+            response = HttpResponse(qr_png(qr_data), content_type="image/png")
+        response["ETag"] = etag
+        # private: the endpoint is per-teacher, so shared caches must not keep it
+        patch_cache_control(response, private=True, max_age=QR_MAX_AGE)
+        return response
     except Exception as e:
         # Return a blank 1x1 pixel if generation fails
         logger.error(f"QR code generation failed for {quiz_code}: {e}")
@@ -755,39 +758,6 @@ def enter_quiz(request):
 
     return render(request, "quizzes/enter_quiz.html", {"form": form})
 
-@staff_required
-@require_POST
-def allow_extra_attempt(request, quiz_id, student_id):
-    quiz = get_object_or_404(Quiz, id=quiz_id, teacher=request.user)
-    student = get_object_or_404(User, id=student_id)
-
-    perm, _ = QuizAttemptPermission.objects.get_or_create(
-        quiz=quiz, student_user=student,
-        defaults={"allowed_attempts": 1}
-    )
-    perm.allowed_attempts += 1
-    perm.save()
-
-    messages.success(request, f"Extra attempt allowed for {student.username}.")
-    return redirect("quiz_submissions", quiz_id=quiz.id)
-
-@staff_required
-def edit_quiz_settings(request, quiz_id):
-    quiz = get_object_or_404(Quiz, id=quiz_id, teacher=request.user)
-
-    form = QuizSettingsForm(request.POST or None, instance=quiz)
-
-    if request.method == "POST" and form.is_valid():
-        form.save()
-        messages.success(request, "Quiz settings updated.")
-        return redirect("teacher_quiz_detail", quiz_id=quiz.id)
-
-    return render(request, "quizzes/edit_quiz_settings.html", {
-        "quiz": quiz,
-        "form": form
-    })
-
-
 def quiz_join(request, quiz_code):
     """
     Join Quiz page - shown when QR code is scanned.
@@ -852,30 +822,42 @@ def take_quiz(request, quiz_code):
         messages.error(request, "Only students can take quizzes.")
         return redirect("student_dashboard")
     
-    quiz = get_object_or_404(Quiz, code=quiz_code.upper())
+    # The attempt limit (default = 1) and this student's finished attempts
+    # come back with the quiz row itself instead of two follow-up queries
+    quiz = get_object_or_404(
+        Quiz.objects.annotate(
+            allowed_attempts=Coalesce(
+                Subquery(
+                    QuizAttemptPermission.objects
+                    .filter(quiz=OuterRef("pk"), student_user=request.user)
+                    .values("allowed_attempts")[:1]
+                ),
+                Value(1),
+            ),
+            attempts_used=Count(
+                "submissions",
+                filter=Q(submissions__student_user=request.user, submissions__is_submitted=True),
+            ),
+        ),
+        code=quiz_code.upper(),
+    )
+
+    # One clock reading for every time check in this request
+    now = timezone.now()
 
     # ✅ 1) Teacher stopped quiz OR due date passed
-    if not quiz.can_start():
+    if not quiz.can_start(now):
         messages.error(request, "This quiz is closed.")
         return redirect("student_dashboard")
 
-    # ✅ 2) Attempt limit (default = 1)
-    perm = QuizAttemptPermission.objects.filter(
-        quiz=quiz, student_user=request.user
-    ).first()
-    allowed = perm.allowed_attempts if perm else 1
-
-    attempts_used = Submission.objects.filter(
-        quiz=quiz,
-        student_user=request.user,
-        is_submitted=True
-    ).count()
-
-    if attempts_used >= allowed:
+    # ✅ 2) Attempt limit
+    attempts_used = quiz.attempts_used
+    if attempts_used >= quiz.allowed_attempts:
         messages.error(request, "You already submitted this quiz.")
         return redirect("student_dashboard")
 
-    questions = quiz.questions.all().order_by("id")
+    # Evaluated once: counted, rendered and (on submit) graded from this list
+    questions = list(quiz.questions.order_by("id"))
 
     # ✅ 3) Get or create an in-progress submission (so refresh won’t create new one)
     submission = Submission.objects.filter(
@@ -887,37 +869,37 @@ def take_quiz(request, quiz_code):
     if not submission:
         sp = request.user.student_profile
         # For file upload quizzes, total is 0 (manual grading)
-        total_questions = 0 if quiz.quiz_type == 'file_upload' else questions.count()
+        total_questions = 0 if quiz.quiz_type == 'file_upload' else len(questions)
         submission = Submission.objects.create(
             quiz=quiz,
             student_user=request.user,
             student_name=f"{sp.first_name} {sp.second_name} {sp.third_name}",
             score=0,
             total=total_questions,
-            started_at=timezone.now(),
+            started_at=now,
             is_submitted=False,
             attempt_no=attempts_used + 1,
         )
     else:
         # ✅ IMPORTANT PATCH: old rows may have started_at = NULL
         if submission.started_at is None:
-            submission.started_at = timezone.now()
+            submission.started_at = now
             submission.save(update_fields=["started_at"])
 
     # ✅ 4) Timer in minutes -> seconds
     remaining_seconds = None
     if quiz.duration_minutes:
         duration_seconds = quiz.duration_minutes * 60
-        elapsed = (timezone.now() - submission.started_at).total_seconds()
+        elapsed = (now - submission.started_at).total_seconds()
         remaining_seconds = max(0, int(duration_seconds - elapsed))
 
         # ✅ If time is finished (GET or POST), finalize NOW
         if remaining_seconds <= 0:
-            return _finalize_submission(request, quiz, submission, questions)
+            return _finalize_submission(request, quiz, submission, questions, now)
 
     # ✅ 5) POST = finalize (manual submit OR timer submits the form)
     if request.method == "POST":
-        return _finalize_submission(request, quiz, submission, questions)
+        return _finalize_submission(request, quiz, submission, questions, now)
 
     # ✅ 6) GET = show quiz
     return render(request, "quizzes/take_quiz.html", {
@@ -927,16 +909,28 @@ def take_quiz(request, quiz_code):
         "submission": submission,
     })
 
+# Columns _finalize_submission sets; the rest of the row (name, start time,
+# teacher grading) is left as it is in the database
+_SUBMIT_FIELDS = ["score", "total", "is_submitted", "submitted_at"]
+
+# Radio values a question can post back (Answer.selected must be 1-4)
+_OPTION_VALUES = frozenset({"1", "2", "3", "4"})
+
+
 @transaction.atomic
-def _finalize_submission(request, quiz, submission, questions=None):
+def _finalize_submission(request, quiz, submission, questions=None, now=None):
     from django.contrib import messages  # Import at top of function
     
     # If already submitted, go to result
     if submission.is_submitted:
         return redirect("quiz_result", quiz_code=quiz.code, submission_id=submission.id)
 
+    # Reuse the caller's clock reading so every check in the request agrees
+    if now is None:
+        now = timezone.now()
+
     # Teacher stopped it / due date passed mid-attempt
-    if not quiz.can_start():
+    if not quiz.can_start(now):
         messages.error(request, "Quiz was closed by the teacher.")
         return redirect("student_dashboard")
 
@@ -944,17 +938,11 @@ def _finalize_submission(request, quiz, submission, questions=None):
     if quiz.quiz_type == 'file_upload':
         uploaded_file = request.FILES.get('file')
         if uploaded_file:
-            # Validate file
-            max_size = 10 * 1024 * 1024  # 10MB
-            allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png']
-            ext = uploaded_file.name.split('.')[-1].lower()
-            
-            if uploaded_file.size > max_size:
-                messages.error(request, "File size must be under 10MB")
-                return redirect("take_quiz", quiz_code=quiz.code)
-            
-            if ext not in allowed_extensions:
-                messages.error(request, "Only PDF, JPG, and PNG files are allowed")
+            # Validate file (same rules as FileUploadSubmissionForm)
+            try:
+                validate_upload(uploaded_file)
+            except ValidationError as exc:
+                messages.error(request, exc.messages[0])
                 return redirect("take_quiz", quiz_code=quiz.code)
             
             # Save file submission
@@ -967,8 +955,8 @@ def _finalize_submission(request, quiz, submission, questions=None):
             submission.score = 0  # Will be graded manually
             submission.total = 0
             submission.is_submitted = True
-            submission.submitted_at = timezone.now()
-            submission.save()
+            submission.submitted_at = now
+            submission.save(update_fields=_SUBMIT_FIELDS)
             
             messages.success(request, "Your file has been submitted successfully!")
             return redirect("quiz_result", quiz_code=quiz.code, submission_id=submission.id)
@@ -985,23 +973,18 @@ def _finalize_submission(request, quiz, submission, questions=None):
 
     score = 0
     total = 0  # Count non-file-upload questions
+    answers = []
 
     for q in questions:
         if q.question_type == 'file_upload':
             # Handle file upload question
             uploaded_file = request.FILES.get(f"file_{q.id}")
             if uploaded_file:
-                # Validate file
-                max_size = 10 * 1024 * 1024  # 10MB
-                allowed_extensions = ['pdf', 'jpg', 'jpeg', 'png']
-                ext = uploaded_file.name.split('.')[-1].lower()
-                
-                if uploaded_file.size > max_size:
-                    messages.error(request, f"File for Q{q.id} must be under 10MB")
-                    return redirect("take_quiz", quiz_code=quiz.code)
-                
-                if ext not in allowed_extensions:
-                    messages.error(request, f"Only PDF, JPG, and PNG files are allowed")
+                # Validate file (same rules as FileUploadSubmissionForm)
+                try:
+                    validate_upload(uploaded_file)
+                except ValidationError as exc:
+                    messages.error(request, f"File for Q{q.id}: {exc.messages[0]}")
                     return redirect("take_quiz", quiz_code=quiz.code)
                 
                 # Save file submission linked to the question
@@ -1013,34 +996,38 @@ def _finalize_submission(request, quiz, submission, questions=None):
                 )
             
             # File upload questions are graded manually (don't count toward auto-score)
-            Answer.objects.create(
+            answers.append(Answer(
                 submission=submission,
                 question=q,
                 selected=None,
                 is_correct=False,  # Will be graded manually
-            )
+            ))
         else:
             # Handle multiple choice / true-false
             total += 1
             selected = request.POST.get(f"question_{q.id}")
-            selected_int = int(selected) if selected else None
+            # Anything but an option number (tampered form) counts as unanswered
+            selected_int = int(selected) if selected in _OPTION_VALUES else None
 
             is_correct = (selected_int == q.correct_option)
             if is_correct:
                 score += 1
 
-            Answer.objects.create(
+            answers.append(Answer(
                 submission=submission,
                 question=q,
                 selected=selected_int,
                 is_correct=is_correct,
-            )
+            ))
+
+    # One multi-row INSERT for the whole attempt instead of one per question
+    Answer.objects.bulk_create(answers, batch_size=500)
 
     submission.score = score
     submission.total = total
     submission.is_submitted = True
-    submission.submitted_at = timezone.now()
-    submission.save()
+    submission.submitted_at = now
+    submission.save(update_fields=_SUBMIT_FIELDS)
 
     return redirect("quiz_result", quiz_code=quiz.code, submission_id=submission.id)
 
@@ -1079,7 +1066,11 @@ def quiz_result(request, quiz_code, submission_id):
     quiz = get_object_or_404(Quiz, code=quiz_code)
 
     # ✅ scope submission to the quiz to avoid mismatches
-    submission = get_object_or_404(Submission, id=submission_id, quiz=quiz)
+    # (student + profile come in the same query - both are read below)
+    submission = get_object_or_404(
+        Submission.objects.select_related("student_user__student_profile"),
+        id=submission_id, quiz=quiz,
+    )
 
     # ✅ safe student display
     student_name = submission.student_name or ""
@@ -1137,24 +1128,32 @@ def teacher_login(request):
             return redirect("teacher_quizzes")
         return redirect("student_dashboard")
 
-    form = TeacherLoginForm(request.POST or None)
-
-    if request.method == "POST" and form.is_valid():
-        user = authenticate(
-            request,
-            username=form.cleaned_data["username"],
-            password=form.cleaned_data["password"],
-        )
+    # The POST is read directly - TeacherLoginForm only renders the page.
+    # Both values are stripped, as the form's CharFields did (and as
+    # TeacherSignupForm still does when the password is set).
+    username = ""
+    if request.method == "POST":
+        username = request.POST.get("username", "").strip()
+        # Not stripped: passwords may start or end with spaces (as in
+        # AuthenticationForm and ChangePasswordForm)
+        password = request.POST.get("password", "")
+        user = authenticate(request, username=username, password=password) if username and password else None
         if user and user.is_staff:
             login(request, user)
             return redirect("teacher_quizzes")
         messages.error(request, "Invalid teacher credentials.")
 
+    form = TeacherLoginForm(initial={"username": username})
     return render(request, "quizzes/teacher_login.html", {"form": form})
 
 @staff_required
 def teacher_quizzes(request):
-    folders = SubjectFolder.objects.filter(teacher=request.user).order_by("name")
+    # Quiz counts come with the folder rows (one query, not two per folder)
+    folders = (
+        SubjectFolder.objects.filter(teacher=request.user)
+        .annotate(quiz_count=Count("quizzes"))
+        .order_by("name")
+    )
     ungrouped = (
         Quiz.objects.filter(teacher=request.user, folder__isnull=True)
         .annotate(
@@ -1248,60 +1247,68 @@ def folder_analytics(request, folder_id):
     """AI-powered analytics to identify weak topics for students in a folder"""
     folder = get_object_or_404(SubjectFolder, id=folder_id, teacher=request.user)
     
-    # Get all quizzes in folder
-    quizzes = folder.quizzes.all()
+    # Every finished submission in the folder, loaded together with its quiz,
+    # student profile and answers (+ questions): a fixed handful of queries
+    # instead of one per quiz plus two per submission.
+    # Ordered like the old per-quiz loop (newest quiz first, then Submission's
+    # own ordering) so ties in the tables below come out the same way.
+    submissions = (
+        Submission.objects
+        .filter(quiz__folder=folder, is_submitted=True)
+        .select_related('quiz', 'student_user__student_profile')
+        .prefetch_related('answers__question')
+        .order_by('-quiz__created_at', 'quiz_id', '-submitted_at', '-id')
+    )
     
     # Collect all wrong answers with question details
     wrong_answers_data = []
     question_stats = {}
     student_performance = {}
     
-    for quiz in quizzes:
-        submissions = Submission.objects.filter(quiz=quiz, is_submitted=True).select_related('student_user')
+    for submission in submissions:
+        quiz = submission.quiz
+        student_id = submission.student_user_id
+        if student_id not in student_performance:
+            student_name = submission.student_name
+            if submission.student_user and hasattr(submission.student_user, 'student_profile'):
+                sp = submission.student_user.student_profile
+                student_name = f"{sp.first_name} {sp.second_name}".strip()
+            student_performance[student_id] = {
+                'name': student_name,
+                'total_questions': 0,
+                'correct': 0,
+                'wrong_topics': [],
+            }
         
-        for submission in submissions:
-            student_id = submission.student_user_id
-            if student_id not in student_performance:
-                student_name = submission.student_name
-                if submission.student_user and hasattr(submission.student_user, 'student_profile'):
-                    sp = submission.student_user.student_profile
-                    student_name = f"{sp.first_name} {sp.second_name}".strip()
-                student_performance[student_id] = {
-                    'name': student_name,
-                    'total_questions': 0,
-                    'correct': 0,
-                    'wrong_topics': [],
+        answers = submission.answers.all()
+        for answer in answers:
+            q = answer.question
+            if q.question_type == 'file_upload':
+                continue  # Skip file upload questions
+            
+            student_performance[student_id]['total_questions'] += 1
+            
+            # Track question stats
+            if q.id not in question_stats:
+                question_stats[q.id] = {
+                    'text': q.text[:100],
+                    'quiz_title': quiz.title,
+                    'total_attempts': 0,
+                    'wrong_count': 0,
+                    'question_type': q.question_type,
                 }
             
-            answers = submission.answers.select_related('question').all()
-            for answer in answers:
-                q = answer.question
-                if q.question_type == 'file_upload':
-                    continue  # Skip file upload questions
-                
-                student_performance[student_id]['total_questions'] += 1
-                
-                # Track question stats
-                if q.id not in question_stats:
-                    question_stats[q.id] = {
-                        'text': q.text[:100],
-                        'quiz_title': quiz.title,
-                        'total_attempts': 0,
-                        'wrong_count': 0,
-                        'question_type': q.question_type,
-                    }
-                
-                question_stats[q.id]['total_attempts'] += 1
-                
-                if answer.is_correct:
-                    student_performance[student_id]['correct'] += 1
-                else:
-                    question_stats[q.id]['wrong_count'] += 1
-                    wrong_answers_data.append({
-                        'question': q.text,
-                        'quiz': quiz.title,
-                        'student': student_performance[student_id]['name'],
-                    })
+            question_stats[q.id]['total_attempts'] += 1
+            
+            if answer.is_correct:
+                student_performance[student_id]['correct'] += 1
+            else:
+                question_stats[q.id]['wrong_count'] += 1
+                wrong_answers_data.append({
+                    'question': q.text,
+                    'quiz': quiz.title,
+                    'student': student_performance[student_id]['name'],
+                })
     
     # Calculate difficulty rates
     difficult_questions = []
@@ -1567,7 +1574,10 @@ def quiz_submissions(request, quiz_id):
 def grade_submission(request, quiz_id, submission_id):
     """Teacher view to grade a student's submission with file uploads"""
     quiz = get_object_or_404(Quiz, id=quiz_id, teacher=request.user)
-    submission = get_object_or_404(Submission, id=submission_id, quiz=quiz)
+    submission = get_object_or_404(
+        Submission.objects.select_related("student_user__student_profile"),
+        id=submission_id, quiz=quiz,
+    )
     
     # Get answers and file submissions
     answers = submission.answers.select_related('question').order_by('id')
@@ -1798,18 +1808,16 @@ def student_dashboard(request):
         "form": form,
     })
 
-from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, get_object_or_404
-from .models import Submission
-
 @student_required
 def student_submission_detail(request, submission_id):
     submission = get_object_or_404(
-        Submission.objects.select_related("quiz", "student_user").prefetch_related("answers__question"),
+        Submission.objects.select_related("quiz", "student_user"),
         id=submission_id,
         student_user=request.user,  
     )
 
+    # Answers (with their questions) are loaded here in one ordered query;
+    # prefetching them on the submission as well would just be discarded
     answers = submission.answers.select_related("question").all().order_by("question__id")
     file_submissions = submission.file_submissions.select_related("question").all()
 
@@ -1832,7 +1840,8 @@ def move_quiz(request, quiz_id):
     form = MoveQuizForm(request.POST or None, teacher=request.user)
 
     if request.method == "POST" and form.is_valid():
-        quiz.folder = form.cleaned_data["folder"]
+        # The form hands back a validated pk (or None), not a SubjectFolder
+        quiz.folder_id = form.cleaned_data["folder"]
         quiz.save()
         messages.success(request, "Quiz moved successfully.")
         return redirect("teacher_quizzes")
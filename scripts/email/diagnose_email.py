@@ -1,48 +1,84 @@
 #!/usr/bin/env python
+"""
+Print the email configuration, and optionally send a test email.
+
+    python scripts/email/diagnose_email.py                # config only (fast, no django.setup())
+    python scripts/email/diagnose_email.py --send         # also send a test email
+    python scripts/email/diagnose_email.py --send --to you@example.com
+"""
 import os
 import sys
+import argparse
+import importlib
+from pathlib import Path
+
+# Make the project importable when run from anywhere
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quizz_app.settings')
 
-import django
-django.setup()
-
-from django.conf import settings
-
-print("\n--- DJANGO EMAIL CONFIGURATION ---\n")
-
-print("EMAIL_BACKEND:", settings.EMAIL_BACKEND)
-print("EMAIL_HOST:", settings.EMAIL_HOST)
-print("EMAIL_PORT:", settings.EMAIL_PORT)
-print("EMAIL_USE_TLS:", settings.EMAIL_USE_TLS)
-print("EMAIL_HOST_USER:", settings.EMAIL_HOST_USER)
-
-pwd = settings.EMAIL_HOST_PASSWORD
-if pwd:
-    print(f"EMAIL_HOST_PASSWORD: SET (length={len(pwd)} chars)")
-else:
-    print("EMAIL_HOST_PASSWORD: NOT SET / EMPTY")
-    print("  -> Add this environment variable on Render!")
-
-print("DEFAULT_FROM_EMAIL:", settings.DEFAULT_FROM_EMAIL)
-print("SITE_ID:", getattr(settings, 'SITE_ID', 'NOT SET'))
-
-print("\n--- Testing email send ---\n")
-from django.core.mail import send_mail
-
-try:
-    result = send_mail(
-        subject="Quizfy SMTP Test",
-        message="If you see this, email works!",
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=["test@example.com"],
-        fail_silently=False,
-    )
-    print(f"SUCCESS: Email send returned {result}")
-except Exception as e:
-    print(f"ERROR: {type(e).__name__}: {e}")
-    import traceback
-    print("\nFull traceback:")
-    traceback.print_exc()
-
-print("\n" + "-"*50)
+
+def print_config(settings):
+    print("\n--- DJANGO EMAIL CONFIGURATION ---\n")
+
+    print("EMAIL_BACKEND:", getattr(settings, 'EMAIL_BACKEND', 'NOT SET'))
+    print("EMAIL_HOST:", getattr(settings, 'EMAIL_HOST', 'NOT SET'))
+    print("EMAIL_PORT:", getattr(settings, 'EMAIL_PORT', 'NOT SET'))
+    print("EMAIL_USE_TLS:", getattr(settings, 'EMAIL_USE_TLS', 'NOT SET'))
+    print("EMAIL_HOST_USER:", getattr(settings, 'EMAIL_HOST_USER', 'NOT SET'))
+
+    pwd = getattr(settings, 'EMAIL_HOST_PASSWORD', '')
+    if pwd:
+        print(f"EMAIL_HOST_PASSWORD: SET (length={len(pwd)} chars)")
+    else:
+        print("EMAIL_HOST_PASSWORD: NOT SET / EMPTY")
+        print("  -> Add this environment variable on Render!")
+
+    print("DEFAULT_FROM_EMAIL:", getattr(settings, 'DEFAULT_FROM_EMAIL', 'NOT SET'))
+    print("SITE_ID:", getattr(settings, 'SITE_ID', 'NOT SET'))
+
+
+def send_test_email(recipient):
+    from django.conf import settings
+    from django.core.mail import send_mail
+
+    print("\n--- Testing email send ---\n")
+    try:
+        result = send_mail(
+            subject="Quizfy SMTP Test",
+            message="If you see this, email works!",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[recipient],
+            fail_silently=False,
+        )
+        print(f"SUCCESS: Email send returned {result}")
+    except Exception as e:
+        print(f"ERROR: {type(e).__name__}: {e}")
+        import traceback
+        print("\nFull traceback:")
+        traceback.print_exc()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quizfy email diagnostics")
+    parser.add_argument("--send", action="store_true", help="send a test email (runs django.setup())")
+    parser.add_argument("--to", default="test@example.com", help="recipient for the test email")
+    args = parser.parse_args()
+
+    if args.send:
+        # Only the send path needs the full app registry
+        import django
+        django.setup()
+
+        from django.conf import settings
+        print_config(settings)
+        send_test_email(args.to)
+    else:
+        # Reading the settings module directly skips loading apps/models
+        print_config(importlib.import_module(os.environ['DJANGO_SETTINGS_MODULE']))
+
+    print("\n" + "-"*50)
+
+
+if __name__ == "__main__":
+    main()